@@ -0,0 +1,24 @@
+"""
+Hashgraph consensus engine of the Cyber Power Capstone microgrid simulator.
+
+Importing the package has no side effects and stays fast: PyNaCl is loaded when a key is first made or checked, NumPy
+when a batch path first needs it and asyncio with the TCP Transport. A simulation only runs from the command line
+(python -m hashgraph, or hashgraph_sim_v2_python3.6.py).
+"""
+
+from .event import (ConsensusStream, ConsensusTransaction, Event, Fork, Sample, SyncReport, decode_event,
+                    decode_samples, decode_sync, encode_sync, event_hash, pack_sample, pack_transactions,
+                    unpack_transactions)
+from .metrics import Metrics, SamplingProfiler
+from .network import Network, VirtualClock, WallClock
+from .node import IngestQueue, Node
+from .simulator import LinkModel, Simulator, replay_trace, run_headless
+from .storage import EventLog, GossipTrace, Snapshot, read_trace
+
+
+def __getattr__(name):
+    # The TCP Transport is only used by multi-process runs, so asyncio is imported with it on first access
+    if name == "Transport":
+        from .transport import Transport
+        return Transport
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
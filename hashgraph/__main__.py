@@ -0,0 +1,3 @@
+from .cli import hg_nodes, main
+
+main(hg_nodes)
@@ -0,0 +1,122 @@
+"""
+Benchmark suite for the consensus hot paths.
+"""
+
+import json
+import platform
+import time
+
+from .event import numpy
+from .network import Network
+from .simulator import grow_history
+
+
+BENCH_NODES = (3, 10, 50, 200)  # Default Node counts of a --bench run
+BENCH_EVENTS = (10000, 100000)  # Default history sizes of a --bench run; the default grid takes about 2 minutes
+BENCH_SIGNED = 2000  # Events signed, verified and synced per case; signing a whole history would dominate the run
+
+
+def bench_stage(count, action, *args):
+    '''
+    Times one stage of a benchmark case.
+
+    Args:
+        count (int): Number of items the stage processes, used for the rate.
+        action (function): Runs the stage.
+        *args: Arguments passed to action.
+
+    Returns:
+        (dict): Item count, seconds and items per second.
+
+    '''
+
+    start = time.perf_counter()
+    action(*args)
+    elapsed = time.perf_counter() - start
+    return {"count": count, "seconds": elapsed, "per_second": count / elapsed if elapsed else 0.0}
+
+
+def run_bench_case(n, count, seed, signed=BENCH_SIGNED):
+    '''
+    Benchmarks the hot paths for one Node count and history size. Signing, verification and sync merge are timed on
+    signed Events from a fresh Network; insertion, divide_rounds, decide_fame and find_order are timed over a history of
+    count Events on a single Node, each stage run once over the whole history.
+
+    Args:
+        n (int): Number of Nodes.
+        count (int): Number of Events in the history.
+        seed (int): Seed for keys, gossip partners and samples.
+        signed (int): Number of signed Events for the signing, verification and sync stages.
+
+    Returns:
+        (dict): Per-stage timings and the consensus reached, which is the same on every run with the same seed.
+
+    '''
+
+    names = ["N{}".format(i) for i in range(n)]
+    signed = min(signed, count)
+
+    nw = Network(headless=True, seed=seed)
+    nw.init_nodes(names)
+    nw.node_set_network(nw)
+    creator, receiver = nw.nodes[0], nw.nodes[1]
+    creator.insert_event(receiver.hg[receiver.name][0])  # Other-parent of every Event the creator makes
+    stages = {}
+    stages["create_event"] = bench_stage(signed, lambda: [creator.create_event(creator.generate_random_data(), receiver) for i in range(signed)])
+    chain = creator.hg[creator.name][1:]
+    stages["sign_event"] = bench_stage(signed, lambda: [creator.sign_event(i) for i in chain])
+    stages["verify_event"] = bench_stage(signed, lambda: [receiver.verify_event(i) for i in chain])
+    stages["sync"] = bench_stage(signed, creator.sync, receiver)
+    nw.shutdown()
+
+    nw = Network(headless=True, seed=seed)
+    nw.init_nodes(names)
+    nw.node_set_network(nw)
+    node = nw.nodes[0]
+    stages["insert_event"] = bench_stage(count, grow_history, nw, node, count)
+    stages["divide_rounds"] = bench_stage(count, node.divide_rounds)
+    stages["decide_fame"] = bench_stage(count, node.decide_fame)
+    stages["find_order"] = bench_stage(count, node.find_order)
+    nw.shutdown()
+
+    return {
+            "nodes": n,
+            "events": count,
+            "stages": stages,
+            "rounds_decided": node.fame_round - 1,
+            "events_ordered": node.consensus_base + len(node.consensus),
+            "order_digest": node.order_digest().hex(),
+    }
+
+
+def run_bench(path, nodes=BENCH_NODES, sizes=BENCH_EVENTS, seed=0, signed=BENCH_SIGNED):
+    '''
+    Runs run_bench_case for every Node count and history size and writes the results to a JSON file, so consensus
+    throughput can be compared between versions. Runs are headless and seeded; only the timings vary between runs.
+
+    Args:
+        path (String): File the JSON results are written to.
+        nodes (List): Node counts.
+        sizes (List): History sizes in Events.
+        seed (int): Seed shared by every case.
+        signed (int): Number of signed Events for the signing, verification and sync stages.
+
+    Returns:
+        (dict): The results written to path.
+
+    '''
+
+    results = {
+            "python": platform.python_version(),
+            "numpy": numpy().__version__ if numpy() is not None else None,
+            "seed": seed,
+            "cases": [],
+    }
+    for n in nodes:
+        for count in sizes:
+            case = run_bench_case(n, count, seed, signed)
+            results["cases"].append(case)
+            print("nodes={} events={} ".format(n, count) + " ".join("{}={:.0f}/s".format(k, v["per_second"]) for k, v in case["stages"].items()))
+            with open(path, "w") as f:
+                json.dump(results, f, indent=1)  # Rewritten after every case so a long run keeps its finished cases
+    return results
@@ -0,0 +1,290 @@
+"""
+Command line entry point of the simulator. Nothing runs at import; main() is called by python -m hashgraph and by
+hashgraph_sim_v2_python3.6.py.
+"""
+
+import argparse
+import logging
+import threading
+
+from . import node
+from .metrics import SamplingProfiler
+from .node import BATCH_MAX_BYTES, BATCH_MAX_COUNT
+from .network import Network
+from .simulator import LinkModel, Simulator, replay_trace, run_headless, run_memory_bench
+from .storage import GossipTrace
+from .bench import BENCH_EVENTS, BENCH_NODES, BENCH_SIGNED, run_bench
+from .sweep import SWEEP_BYZANTINE, SWEEP_INTERVALS, SWEEP_NODES, SWEEP_SEEDS, run_sweep, sweep_grid
+
+
+log = logging.getLogger(__name__)
+
+
+hg_nodes = ["421-C", "451-A", "421-D"]
+N = len(hg_nodes)
+current_node = 0
+current_node_name = hg_nodes[current_node]
+rand_node = 1
+
+
+def test_nodes(nw, iterations=None):
+    '''
+    Tests the Nodes on the network by simulating the begin_sync and wait_sync methods.
+
+    Args:
+        nw (object Network): Simulated Network.
+        iterations (int): Number of syncs to attempt, None to run until interrupted.
+
+    '''
+
+    # Simulation threading: one listener per node, blocked on its sync inbox until a sync arrives
+    for i in nw.nodes:
+        threading.Thread(target=i.serve, daemon=True).start()
+
+    iteration = 0
+    while iterations is None or iteration < iterations:
+        iteration += 1
+
+        r_node = nw.rng.choice(list(nw.nodes[current_node].hg))
+        new_node = nw.rng.choice(list(nw.nodes[current_node].hg))
+        # Pick random node != current node. Only works with most current version of Python 3.
+
+
+
+        while(r_node == (new_node)):#while(r_node == (new_node := random.choice(list(nw.nodes[current_node].hg)))):
+            new_node = nw.rng.choice(list(nw.nodes[current_node].hg))
+
+
+        log.info("\nNode initiating sync: %s: Begin sync to node %s\n", r_node, new_node)
+
+        nw.pause(2)
+
+        r_idx = 0
+        for i in nw.nodes:
+            if i.name == r_node:
+                break
+            r_idx += 1
+
+        #pdb.set_trace()
+        # The receiving node's listener thread answers the sync; begin_sync blocks until it is done
+        report = nw.nodes[r_idx].begin_sync(new_node)
+        if report is None:
+            continue
+        log.info("\nNew event created. HG updated. Sent %d events (%d bytes) from %s to %s.\n______________________\n\n", report.events_sent, report.bytes_sent, report.sender, report.receiver)
+
+        if log.isEnabledFor(logging.DEBUG):
+            for i in nw.nodes:
+                log.debug("--------\nHashgraph for Node %s: ", i.name)
+                i.print_hashgraph()
+                log.debug("--------")
+
+        log.info("\n______________________\n")
+
+        nw.pause(2)
+
+        # DIVIDE ROUNDS - This will run individually on each node
+
+        for i in nw.nodes:
+            i.divide_rounds()
+        # DECIDE FAME - This will run individually on each node
+        for i in nw.nodes:
+            i.decide_fame()
+
+
+        # FIND ORDER - This will run individually on each node
+        for i in nw.nodes:
+            i.find_order()
+    return
+
+
+def parse_args(argv=None):
+    '''
+    Parses the command line options of the simulator.
+
+    Args:
+        argv (List): Arguments to parse, sys.argv[1:] by default.
+
+    Returns:
+        (argparse.Namespace): The parsed options.
+
+    '''
+
+    parser = argparse.ArgumentParser(description="Hashgraph Algorithm Simulator")
+    parser.add_argument("--headless", action="store_true", help="run a fixed number of syncs with a virtual clock and no output")
+    parser.add_argument("--steps", type=int, default=1000, help="number of syncs in a headless run, or started by the node with --node-id")
+    parser.add_argument("--seed", type=int, default=None, help="seed for gossip, samples and keys")
+    parser.add_argument("--nodes", type=int, default=None, help="number of simulated nodes (default: the hg_nodes list)")
+    parser.add_argument("--des", action="store_true", help="run the discrete-event network simulator (implies --headless)")
+    parser.add_argument("--duration", type=float, default=60.0, help="simulated seconds of a --des run")
+    parser.add_argument("--interval", type=float, default=1.0, help="mean seconds between syncs started by each node in a --des run, or with --node-id")
+    parser.add_argument("--latency", type=float, default=0.05, help="link latency in seconds for a --des run")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum extra link latency in seconds for a --des run")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability that a sync is lost in a --des run")
+    parser.add_argument("--observers", type=int, default=None, help="number of nodes running consensus in a --des run (default: all)")
+    parser.add_argument("--verify-workers", type=int, default=0, help="pool size for batch signature verification (default: verify inline)")
+    parser.add_argument("--verify-processes", action="store_true", help="use a process pool instead of a thread pool for verification")
+    parser.add_argument("--log-dir", default=None, help="keep an append-only event log per node in this directory and recover from it on startup (requires --seed)")
+    parser.add_argument("--node-id", type=int, default=None, help="run only this node, gossiping over TCP with the other nodes' processes (requires --seed)")
+    parser.add_argument("--host", default="127.0.0.1", help="address every node listens on with --node-id")
+    parser.add_argument("--port", type=int, default=7000, help="listening port of node 0 with --node-id; node i uses port + i")
+    parser.add_argument("--memory-bench", type=int, default=None, metavar="EVENTS", help="report the memory held per event after inserting this many events (implies --headless)")
+    parser.add_argument("--bench", default=None, metavar="PATH", help="run the benchmark suite and write the results to this JSON file")
+    parser.add_argument("--bench-nodes", default=",".join(map(str, BENCH_NODES)), help="comma-separated node counts of a --bench run")
+    parser.add_argument("--bench-events", default=",".join(map(str, BENCH_EVENTS)), help="comma-separated history sizes of a --bench run; the default grid takes about 2 minutes, and 1000000 events take about 1 minute with 3 nodes")
+    parser.add_argument("--bench-signed", type=int, default=BENCH_SIGNED, help="events signed, verified and synced per --bench case")
+    parser.add_argument("--sweep", default=None, metavar="PATH", help="run a discrete-event simulation for every combination of the --sweep-* values in parallel and stream one CSV row per run to this file")
+    parser.add_argument("--sweep-nodes", default=",".join(map(str, SWEEP_NODES)), help="comma-separated node counts of a --sweep run")
+    parser.add_argument("--sweep-intervals", default=",".join(map(str, SWEEP_INTERVALS)), help="comma-separated mean seconds between syncs of a --sweep run")
+    parser.add_argument("--sweep-byzantine", default=",".join(map(str, SWEEP_BYZANTINE)), help="comma-separated fractions of forking nodes of a --sweep run")
+    parser.add_argument("--sweep-seeds", default=",".join(map(str, SWEEP_SEEDS)), help="comma-separated seeds of a --sweep run")
+    parser.add_argument("--sweep-workers", type=int, default=None, help="worker processes of a --sweep run (default: one per CPU)")
+    parser.add_argument("--trace", default=None, metavar="PATH", help="record every created event and received sync of a simulated run to this trace file")
+    parser.add_argument("--replay", default=None, metavar="PATH", help="replay a --trace file at full speed, with no sleeps or signatures, and report the time spent per consensus stage")
+    parser.add_argument("--metrics", default=None, metavar="PATH", help="write the metrics registry to this file when the run ends")
+    parser.add_argument("--metrics-format", choices=["json", "prometheus"], default="json", help="format of the --metrics file")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=None, help="tracing level (default: DEBUG for the interactive simulation, WARNING otherwise)")
+    parser.add_argument("--iterations", type=int, default=None, help="syncs attempted by the interactive simulation (default: run until interrupted)")
+    parser.add_argument("--profile", default=None, metavar="DIR", help="sample the run's call stacks and write per-stage profiles and collapsed stacks to this directory")
+    parser.add_argument("--profile-interval", type=float, default=0.001, help="seconds between --profile samples")
+    parser.add_argument("--samples-per-sync", type=int, default=1, help="simulated relay samples each node queues between two of its events")
+    parser.add_argument("--batch-count", type=int, default=BATCH_MAX_COUNT, help="most queued samples packed into one event")
+    parser.add_argument("--batch-bytes", type=int, default=BATCH_MAX_BYTES, help="most payload bytes packed into one event")
+    parser.add_argument("--byzantine", type=int, default=0, metavar="K", help="the first K simulated nodes fork their latest event when syncing with odd-numbered nodes")
+    parser.add_argument("--keep-rounds", type=int, default=None, help="prune events received more than this many decided rounds ago into a signed snapshot (not with --node-id)")
+    return parser.parse_args(argv)
+
+
+def report(nw, summary, args):
+    '''
+    Ends a run: shuts the Network down, prints the summary and writes the metrics file if one was asked for. Exits with
+    an error if the honest Nodes ordered different Events at the same position.
+
+    Args:
+        nw (object Network): The Network that ran.
+        summary (dict): Summary of the run.
+        args (argparse.Namespace): The parsed options.
+
+    '''
+
+    nw.shutdown()
+    print(" ".join("{}={}".format(k, v) for k, v in sorted(summary.items())))
+    if args.metrics is not None:
+        nw.metrics.dump(args.metrics, args.metrics_format)
+    if summary.get("orders_agree") is False:
+        raise SystemExit("honest nodes ordered different events at the same consensus position")
+    return
+
+
+#pdb.set_trace()
+def main(nodes, argv=None):
+
+    args = parse_args(argv)
+    if args.node_id is not None and args.seed is None:
+        raise SystemExit("--node-id needs --seed so that every process derives the same keys")
+    if args.log_dir is not None and args.seed is None:
+        raise SystemExit("--log-dir needs --seed so that recovered events are signed with the keys of the restarted nodes")
+    if args.node_id is not None and args.keep_rounds is not None:
+        raise SystemExit("--keep-rounds cannot be used with --node-id: the TCP transport cannot send a snapshot, so a lagging node could never catch up")
+    interactive = not (args.headless or args.des or args.memory_bench is not None or args.bench is not None or args.sweep is not None or args.replay is not None or args.node_id is not None)
+    logging.basicConfig(format="%(message)s", level=args.log_level or ("DEBUG" if interactive else "WARNING"))
+
+    profiler = None
+    if args.profile is not None:
+        profiler = SamplingProfiler(args.profile_interval)
+        profiler.start()
+    try:
+        run_simulation(nodes, args)
+    finally:
+        # Also reached on Ctrl-C, which is how the interactive simulation normally ends
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(args.profile)
+    return
+
+
+def run_simulation(nodes, args):
+    '''
+    Sets up the Network and runs the mode selected on the command line.
+
+    Args:
+        nodes (List): Names of the simulated Nodes, unless --nodes is given.
+        args (argparse.Namespace): The parsed options.
+
+    '''
+
+    if args.nodes is not None:
+        nodes = ["N{}".format(i) for i in range(args.nodes)]
+
+    if args.bench is not None:
+        bench_nodes = [int(i) for i in args.bench_nodes.split(",")]
+        bench_events = [int(i) for i in args.bench_events.split(",")]
+        run_bench(args.bench, bench_nodes, bench_events, args.seed or 0, args.bench_signed)
+        return
+
+    if args.replay is not None:
+        summary = replay_trace(args.replay)
+        print(" ".join("{}={}".format(k, v) for k, v in sorted(summary.items())))
+        return
+
+    if args.sweep is not None:
+        grid = sweep_grid([int(i) for i in args.sweep_nodes.split(",")], [float(i) for i in args.sweep_intervals.split(",")],
+                          [float(i) for i in args.sweep_byzantine.split(",")], [int(i) for i in args.sweep_seeds.split(",")])
+        link = LinkModel(args.latency, args.jitter, args.loss)
+        run_sweep(args.sweep, grid, args.duration, link, args.keep_rounds, args.sweep_workers)
+        return
+
+    # Initialize network
+    network = Network(headless=args.headless or args.des or args.memory_bench is not None, seed=args.seed)
+    network.log_dir = args.log_dir
+    network.keep_rounds = args.keep_rounds
+    network.local = args.node_id
+    network.samples_per_sync = args.samples_per_sync
+    network.init_nodes(nodes)
+    if args.trace is not None:
+        network.trace = GossipTrace(args.trace, network.names, args.keep_rounds)  # Opened first so init Events are recorded
+    for i in network.nodes:
+        i.ingest.batch_count = args.batch_count
+        i.ingest.batch_bytes = args.batch_bytes
+    for i in network.nodes[:args.byzantine]:
+        i.byzantine = True
+    network.node_set_network(network)
+    network.set_verifier(args.verify_workers, args.verify_processes)
+
+    if args.node_id is not None:
+        from .transport import run_transport  # asyncio is only loaded for TCP runs
+        node.SIM = False  # begin_sync and wait_sync gossip over the Transport
+        network.verbose = False
+        summary = run_transport(network, args.node_id, args.host, args.port, args.steps, args.interval)
+        report(network, summary, args)
+        return
+
+    if args.memory_bench is not None:
+        summary = run_memory_bench(network, args.memory_bench)
+        report(network, summary, args)
+        return
+
+    if args.des:
+        link = LinkModel(args.latency, args.jitter, args.loss)
+        simulator = Simulator(network, link, args.interval, args.observers)
+        summary = simulator.run(args.duration)
+        report(network, summary, args)
+        return
+
+    if args.headless:
+        summary = run_headless(network, args.steps)
+        report(network, summary, args)
+        return
+
+    # Display nodes
+    network.print_nodes()
+
+    # TEST: Check each Node
+    for i in network.nodes:
+        # TEST: Check Event contents for init Events
+        i.hg[i.name][0].print_event_data()
+        print("")
+
+
+    test_nodes(network, args.iterations)
+    network.shutdown()
+    return
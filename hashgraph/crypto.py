@@ -0,0 +1,109 @@
+"""
+Ed25519 signing and signature checks. PyNaCl is imported on first use rather than with the package, so importing the
+consensus engine, or starting a verification pool worker, does not load libsodium.
+"""
+
+VERIFY_BATCH_MIN = 32  # Smaller batches are verified in the calling thread; a pool costs more than it saves
+_worker_keys = {}  # Parsed VerifyKeys cached per pool worker, keyed by raw key bytes
+
+
+def signing():
+    '''
+    Imports PyNaCl's signing module on first use.
+
+    Returns:
+        (module): nacl.signing.
+
+    '''
+
+    import nacl.signing
+    return nacl.signing
+
+
+def signing_key(seed=None):
+    '''
+    Creates an Ed25519 signing key.
+
+    Args:
+        seed (bytes): 32-byte seed for a reproducible key, None for a random one.
+
+    Returns:
+        (nacl.signing.SigningKey): The key.
+
+    '''
+
+    if seed is not None:
+        return signing().SigningKey(seed)
+    return signing().SigningKey.generate()
+
+
+def verify(verify_key, body, signature):
+    '''
+    Checks a detached signature.
+
+    Args:
+        verify_key (nacl.signing.VerifyKey): Key of the signer.
+        body (bytes): The signed bytes.
+        signature (bytes): The detached 64-byte signature.
+
+    Returns:
+        (bool): True if the signature is valid.
+
+    '''
+
+    import nacl.exceptions
+    try:
+        verify_key.verify(body, signature)
+    except nacl.exceptions.BadSignatureError:
+        return False
+    return True
+
+
+def verify_chunk(jobs):
+    '''
+    Verifies a list of detached signatures. Runs in a thread or process pool worker, so it only takes plain bytes.
+
+    Args:
+        jobs (List): (canonical encoding, signature, raw verify key or None) tuples.
+
+    Returns:
+        (List): True for each signature that verifies, False otherwise.
+
+    '''
+
+    results = []
+    for body, signature, key in jobs:
+        if key is None:
+            results.append(False)
+            continue
+        verify_key = _worker_keys.get(key)
+        if verify_key is None:
+            verify_key = _worker_keys[key] = signing().VerifyKey(key)
+        results.append(verify(verify_key, body, signature))
+    return results
+
+
+def verify_batch(jobs, executor=None, workers=1):
+    '''
+    Verifies many signatures, fanning them out over a pool when one is given. Ed25519 checks in PyNaCl release the GIL,
+    so a thread pool scales as well as a process pool without pickling costs.
+
+    Args:
+        jobs (List): (canonical encoding, signature, raw verify key or None) tuples.
+        executor (concurrent.futures.Executor): Pool to use, or None to verify in the calling thread.
+        workers (int): Number of workers in the pool.
+
+    Returns:
+        (List): Pass/fail result for each job, in order.
+
+    '''
+
+    if executor is None or len(jobs) < VERIFY_BATCH_MIN:
+        return verify_chunk(jobs)
+
+    size = -(-len(jobs) // workers)
+    chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+    results = []
+    for i in executor.map(verify_chunk, chunks):
+        results.extend(i)
+    return results
@@ -0,0 +1,333 @@
+"""
+Events, their canonical encoding and content hash, relay sample payloads and the sync packet format.
+"""
+
+import collections
+import datetime
+import hashlib
+import struct
+
+
+# Canonical event layout: creator id, sequence number, timestamp (ns), self-parent hash, other-parent hash, payload length.
+# The transaction payload follows the header. Parents that do not exist are encoded as NULL_HASH.
+EVENT_HEADER = struct.Struct("<HIq32s32sI")
+HASH_SIZE = 32
+NULL_HASH = bytes(HASH_SIZE)
+
+# An Event's payload is a batch of fixed-size relay sample records: timestamp (ns), relay id, three phase currents
+# (IA, IB, IC) and three phase voltages (VA, VB, VC) as float32
+SAMPLE_RECORD = struct.Struct("<qH6f")
+# NumPy dtype fields with the same layout as SAMPLE_RECORD, so a payload is read as a record array without copying
+SAMPLE_FIELDS = [("timestamp", "<i8"), ("relay", "<u2"), ("current", "<f4", 3), ("voltage", "<f4", 3)]
+
+# Sync frame layout for each gossiped Event: encoding length, detached signature. The canonical encoding follows.
+# Verify keys are never sent; receivers look them up by creator id in the Network's key registry.
+SYNC_FRAME = struct.Struct("<I64s")
+
+# Counters reported for a single sync
+SyncReport = collections.namedtuple("SyncReport", ["sender", "receiver", "events_sent", "bytes_sent"])
+
+# One decoded relay sample
+Sample = collections.namedtuple("Sample", ["timestamp", "relay", "ia", "ib", "ic", "va", "vb", "vc"])
+
+# Two signed Events by one creator with the same sequence number; either Node can show both to prove the fork
+Fork = collections.namedtuple("Fork", ["creator", "seq", "first", "second"])
+
+# A transaction once it has a place in the consensus order
+ConsensusTransaction = collections.namedtuple("ConsensusTransaction", ["position", "round_received", "timestamp", "creator", "data"])
+
+
+def numpy():
+    '''
+    Imports NumPy on first use. It is optional and slow to import, so importing the package, or starting a pool worker,
+    does not load it.
+
+    Returns:
+        (module): numpy, or None if it is not installed.
+
+    '''
+
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def event_hash(encoded):
+    '''
+    Hashes the canonical encoding of an Event.
+
+    Args:
+        encoded (bytes): Output of Event.encode().
+
+    Returns:
+        (bytes): 32-byte BLAKE2b digest.
+
+    '''
+
+    return hashlib.blake2b(encoded, digest_size=HASH_SIZE).digest()
+
+
+def decode_event(buf, names=None):
+    '''
+    Rebuilds an Event from its canonical encoding. Parents are restored as hashes and resolved through a Node's event index.
+
+    Args:
+        buf (bytes): Canonical encoding produced by Event.encode().
+        names (List): Optional list mapping creator ids to Node names.
+
+    Returns:
+        (object Event): The decoded Event.
+
+    '''
+
+    creator, seq, timestamp, sp_hash, op_hash, size = EVENT_HEADER.unpack_from(buf)
+    start = EVENT_HEADER.size
+    data = bytes(buf[start:start + size]) or None
+    node = names[creator] if names is not None else creator
+    return Event(timestamp, data, sp_hash if sp_hash != NULL_HASH else None, op_hash if op_hash != NULL_HASH else None, node, creator, seq)
+
+
+def pack_sample(timestamp, relay, current, voltage):
+    '''
+    Packs one relay sample into its fixed-size record.
+
+    Args:
+        timestamp (int): Sample time in nanoseconds since the epoch.
+        relay (int): Id of the sampled relay.
+        current (Tuple): Phase currents IA, IB, IC.
+        voltage (Tuple): Phase voltages VA, VB, VC.
+
+    Returns:
+        (bytes): The SAMPLE_RECORD encoding.
+
+    '''
+
+    return SAMPLE_RECORD.pack(timestamp, relay, *current, *voltage)
+
+
+def pack_transactions(samples):
+    '''
+    Packs a batch of sample records into one Event payload. Records have a fixed size, so they are simply concatenated.
+
+    Args:
+        samples (List): Records (bytes) built by pack_sample.
+
+    Returns:
+        (bytes): The payload.
+
+    '''
+
+    return b"".join(samples)
+
+
+def unpack_transactions(payload):
+    '''
+    Unpacks an Event payload built by pack_transactions.
+
+    Args:
+        payload (bytes): The payload.
+
+    Returns:
+        (List): The Sample tuples, in the order they were queued.
+
+    '''
+
+    return [Sample._make(i) for i in SAMPLE_RECORD.iter_unpack(payload)]
+
+
+def decode_samples(payload):
+    '''
+    Views an Event payload, or several concatenated ones, as a NumPy record array of SAMPLE_FIELDS. The array shares the
+    payload's buffer; nothing is copied.
+
+    Args:
+        payload (bytes): The payload.
+
+    Returns:
+        (numpy.ndarray): One record per sample, with timestamp, relay, current[3] and voltage[3] fields.
+
+    Raises:
+        RuntimeError: If NumPy is not installed.
+
+    '''
+
+    np = numpy()
+    if np is None:
+        raise RuntimeError("decode_samples needs NumPy")
+    return np.frombuffer(payload, dtype=np.dtype(SAMPLE_FIELDS))
+
+
+def encode_sync(events):
+    '''
+    Packs signed Events into a single sync packet.
+
+    Args:
+        events (List): Events to send, in topological order.
+
+    Returns:
+        (bytes): The sync packet.
+
+    '''
+
+    frames = []
+    for i in events:
+        body = i.encode()
+        frames.append(SYNC_FRAME.pack(len(body), i.signature))
+        frames.append(body)
+    return b"".join(frames)
+
+
+def decode_sync(packet, names=None, cache=None):
+    '''
+    Unpacks a sync packet built by encode_sync back into signed Events.
+
+    Args:
+        packet (bytes): The sync packet.
+        names (List): Optional list mapping creator ids to Node names.
+        cache (dict): Optional hash -> Event map shared by in-process receivers; Events already in it are reused.
+
+    Returns:
+        (List): The received Events, in the order they were sent.
+
+    '''
+
+    events = []
+    view = memoryview(packet)
+    offset = 0
+    while offset < len(packet):
+        size, signature = SYNC_FRAME.unpack_from(view, offset)
+        offset += SYNC_FRAME.size
+        body = bytes(view[offset:offset + size])
+        offset += size
+
+        if cache is not None and event_hash(body) in cache:
+            events.append(cache[event_hash(body)])
+            continue
+
+        event = decode_event(body, names)
+        event.signature = signature
+        events.append(event)
+        if cache is not None:
+            cache[event.hash] = event
+    return events
+
+
+class Event:
+    """
+    A single Event in the hashgraph. Slots keep the per-Event overhead to the fields themselves; the ancestry vector is a
+    4-byte integer array rather than a list of int objects.
+
+    """
+
+    __slots__ = ("timestamp", "data", "creator", "seq", "sp", "op", "round", "witness", "node_name", "signature", "verified",
+                 "hash", "height", "la", "ss", "fk", "tips")
+
+    def __init__(self, time, data, self_parent_event_hash, other_parent_event_hash, node, creator=0, seq=0):
+        self.timestamp = time #Integer nanoseconds since the epoch
+        self.data = data
+        self.creator = creator
+        self.seq = seq
+        self.sp = self_parent_event_hash #Parents are referenced by content hash, None if the parent does not exist
+        self.op = other_parent_event_hash
+        self.round = None #Set by divide_rounds
+        self.witness = False #True if this is the first Event of its creator in its round
+        self.node_name = node
+        self.signature = None #Detached 64-byte Ed25519 signature of the canonical encoding
+        self.verified = False #Set once the signature has been checked
+        self.hash = event_hash(self.encode()) #Content hash, identical on every node that holds this Event
+        self.height = 0 #Longest path back to an init Event, used to stream Events in topological order
+        self.la = None #Last ancestor: highest sequence number of each creator's ancestors (-1 if none), like a vector clock
+        self.ss = 0 #Witnesses only: bitset of creators whose previous-round witness this Event strongly sees
+        self.fk = 0 #Bitset of creators with both Events of a fork among this Event's ancestors; it sees none of their Events
+        self.tips = None #Creator id -> hash of the latest ancestor by that creator, kept only for creators with a known fork
+
+    def encode(self):
+        '''
+        Packs the Event into its canonical, fixed-layout binary form. Only the creator id, sequence number, timestamp,
+        parent hashes and transaction payload are encoded, so the cost is O(payload) regardless of the size of the hashgraph.
+
+        Returns:
+            (bytes): The canonical encoding used for signing and hashing.
+
+        '''
+
+        payload = self.data or b""
+        if isinstance(payload, str):
+            payload = payload.encode()
+
+        return EVENT_HEADER.pack(self.creator, self.seq, self.timestamp, self.sp or NULL_HASH, self.op or NULL_HASH, len(payload)) + payload
+
+    def transactions(self):
+        '''
+        Lists the transactions carried by the Event.
+
+        Returns:
+            (List): Sample tuples, empty if the Event carries none.
+
+        '''
+
+        if self.data is None:
+            return []
+        return unpack_transactions(self.data)
+
+    def middle_bit(self):
+        '''
+        Returns the middle bit of the Event's signature, used as the pseudorandom vote in coin rounds.
+
+        Returns:
+            (bool): The middle bit of the signature.
+
+        '''
+
+        return bool(self.signature[32] & 1)
+
+    def print_event_data(self):
+        '''
+        Prints the data contained in the current Event.
+
+        '''
+
+        if self.sp != None:
+            sp_temp = self.sp.hex()[:16]
+        else:
+            sp_temp = None
+        if self.op != None:
+            op_temp = self.op.hex()[:16]
+        else:
+            op_temp = None
+
+        timestamp = datetime.datetime.fromtimestamp(self.timestamp / 1e9)
+        print("Data: {}\nTime: {}\nSP: {}\nOP: {}".format(self.transactions(), timestamp, sp_temp, op_temp))
+        return
+
+
+class ConsensusStream:
+    """
+    Tailing iterator over the transactions a Node has placed in consensus order.
+
+    """
+
+    def __init__(self, node, start=0):
+        self.node = node
+        self.position = start  # Consensus position of the next Event to read
+        self.pending = collections.deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self.pending:
+            index = self.position - self.node.consensus_base
+            if index < 0:
+                # Events pruned before they were read are skipped
+                self.position = self.node.consensus_base
+                index = 0
+            if index >= len(self.node.consensus):
+                raise StopIteration
+            r, timestamp, event = self.node.consensus[index]
+            for i in event.transactions():
+                self.pending.append(ConsensusTransaction(self.position, r, timestamp, event.creator, i))
+            self.position += 1
+        return self.pending.popleft()
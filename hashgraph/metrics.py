@@ -0,0 +1,337 @@
+"""
+In-process metrics registry and the sampling profiler.
+"""
+
+import bisect
+import collections
+import json
+import os
+import queue
+import selectors
+import signal
+import sys
+import threading
+import time
+
+
+# Histogram bucket upper bounds, picked by the suffix of the metric name
+SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+# Descriptions of the built-in metrics, written as HELP lines of the Prometheus text format
+METRIC_HELP = {
+    "syncs_total": "Syncs sent",
+    "events_sent_total": "Events sent in syncs",
+    "bytes_sent_total": "Sync packet bytes sent",
+    "sync_seconds": "Duration of a sync, from the known-counts request until the receiver has inserted the Events",
+    "sync_events": "Events sent per sync",
+    "sync_bytes": "Sync packet bytes per sync",
+    "verify_seconds": "Duration of one batch signature verification",
+    "events_verified_total": "Received Events whose signature was checked",
+    "events_rejected_total": "Received Events rejected for a bad signature or a rejected parent",
+    "samples_dropped_total": "Simulated relay samples dropped because the ingest queue was full",
+    "forks_detected_total": "Creators found signing two Events with the same sequence number, summed over the Nodes of this process",
+    "divide_rounds_seconds": "Duration of divide_rounds",
+    "decide_fame_seconds": "Duration of decide_fame",
+    "find_order_seconds": "Duration of find_order",
+    "rounds_decided_total": "Rounds whose fame was decided, summed over the Nodes of this process",
+    "rounds_decided_per_second": "rounds_decided_total divided by the seconds since the registry was created",
+    "events_ordered_total": "Events placed in consensus order, summed over the Nodes of this process",
+    "events_stale_total": "Forked Events left out of consensus order for being too many rounds old, summed over the Nodes of this process",
+    "consensus_latency_seconds": "Time from Event creation to its place in the consensus order, on the Network's clock",
+}
+
+# Functions that start a profiling stage. A sample is tagged with the stage of its innermost frame in this map.
+STAGE_FUNCTIONS = {
+    "sync": "sync",
+    "begin_sync": "sync",
+    "wait_sync": "sync",
+    "receive_sync": "sync",
+    "bootstrap": "sync",
+    "create_event": "sign",
+    "sign_event": "sign",
+    "verify_events": "verify",
+    "verify_event": "verify",
+    "verify_batch": "verify",
+    "divide_rounds": "divide_rounds",
+    "decide_fame": "decide_fame",
+    "find_order": "find_order",
+    "prune": "prune",
+}
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values, as in the Prometheus exposition format.
+
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    In-process metrics registry: counters and histograms by name, created on first use. Updates take a lock, so the
+    simulation's Node threads and the Transport's event loop can share one registry. The registry is dumped as JSON or
+    as a Prometheus text file.
+
+    """
+
+    def __init__(self, prefix="hashgraph_"):
+        '''
+        Args:
+            prefix (String): Prepended to every metric name in the Prometheus output.
+
+        '''
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    def inc(self, name, value=1):
+        '''
+        Adds to a counter.
+
+        Args:
+            name (String): Counter name, ending in _total.
+            value (float): Amount to add.
+
+        '''
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        return
+
+    def observe(self, name, value):
+        '''
+        Records a value in a histogram. Names ending in _seconds use SECONDS_BUCKETS, names ending in _bytes use
+        BYTES_BUCKETS and any other name uses COUNT_BUCKETS.
+
+        Args:
+            name (String): Histogram name.
+            value (float): The observed value.
+
+        '''
+
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                if name.endswith("_seconds"):
+                    bounds = SECONDS_BUCKETS
+                elif name.endswith("_bytes"):
+                    bounds = BYTES_BUCKETS
+                else:
+                    bounds = COUNT_BUCKETS
+                histogram = self.histograms[name] = Histogram(bounds)
+            histogram.observe(value)
+        return
+
+    def gauges(self):
+        '''
+        Derives the rates reported alongside the counters.
+
+        Returns:
+            (dict): Gauge name -> value.
+
+        '''
+
+        elapsed = time.perf_counter() - self.start
+        return {"rounds_decided_per_second": self.counters.get("rounds_decided_total", 0) / elapsed if elapsed else 0.0}
+
+    def to_dict(self):
+        '''
+        Returns:
+            (dict): Every counter, gauge and histogram, with each histogram's bucket bounds, counts, sum and count.
+
+        '''
+
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": self.gauges(),
+                "histograms": {name: {"bounds": list(h.bounds), "counts": list(h.counts), "sum": h.sum, "count": h.count}
+                               for name, h in self.histograms.items()},
+            }
+
+    def to_prometheus(self):
+        '''
+        Returns:
+            (String): The registry in the Prometheus text exposition format.
+
+        '''
+
+        lines = []
+        with self.lock:
+            for kind, values in (("counter", self.counters), ("gauge", self.gauges())):
+                for name, value in sorted(values.items()):
+                    if name in METRIC_HELP:
+                        lines.append("# HELP {}{} {}".format(self.prefix, name, METRIC_HELP[name]))
+                    lines.append("# TYPE {}{} {}".format(self.prefix, name, kind))
+                    lines.append("{}{} {}".format(self.prefix, name, value))
+            for name, h in sorted(self.histograms.items()):
+                if name in METRIC_HELP:
+                    lines.append("# HELP {}{} {}".format(self.prefix, name, METRIC_HELP[name]))
+                lines.append("# TYPE {}{} histogram".format(self.prefix, name))
+                total = 0
+                for bound, count in zip(list(h.bounds) + ["+Inf"], h.counts):
+                    total += count  # Prometheus buckets are cumulative
+                    lines.append("{}{}_bucket{{le=\"{}\"}} {}".format(self.prefix, name, bound, total))
+                lines.append("{}{}_sum {}".format(self.prefix, name, h.sum))
+                lines.append("{}{}_count {}".format(self.prefix, name, h.count))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path, format="json"):
+        '''
+        Writes the registry to a file.
+
+        Args:
+            path (String): Output file.
+            format (String): "json" or "prometheus".
+
+        '''
+
+        with open(path, "w") as f:
+            if format == "prometheus":
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=1)
+        return
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for whole simulation runs. A CPU-time interval timer (SIGPROF) interrupts the process at a fixed
+    interval; the handler records the call stack of every thread that is running and tags it with the consensus stage it
+    falls in, found from STAGE_FUNCTIONS. Nothing is hooked into the profiled code, so it costs nothing when not running
+    and sees the Node threads of the interactive simulation as well as single-threaded headless runs. Native calls such as
+    signing are charged to the Python frame that made them. Threads parked in threading, queue or selectors are idle and
+    are not recorded. The kernel may deliver the timer less often than asked, so each sample is weighted by the process
+    CPU time since the previous one. Needs setitimer, so it is only available on Unix.
+
+    """
+
+    IDLE_FILES = {threading.__file__, queue.__file__, selectors.__file__}  # Innermost frame here: the thread is blocked
+
+    def __init__(self, interval=0.001):
+        '''
+        Args:
+            interval (float): Seconds of process CPU time between samples.
+
+        '''
+        self.interval = interval
+        self.samples = collections.Counter()  # (stage, tuple of code objects, outermost first) -> CPU microseconds
+        self.previous = None  # SIGPROF handler to restore on stop
+        self.last = 0.0  # Process CPU time of the previous sample
+
+    def start(self):
+        '''
+        Starts sampling. Must be called from the main thread.
+
+        Raises:
+            RuntimeError: If the platform has no setitimer.
+
+        '''
+
+        if not hasattr(signal, "setitimer"):
+            raise RuntimeError("Profiling needs signal.setitimer, which this platform does not have")
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        self.last = time.process_time()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous)
+        return
+
+    def sample(self, signum, interrupted):
+        '''
+        SIGPROF handler: records one sample of every running thread.
+
+        Args:
+            signum (int): The signal number.
+            interrupted (frame): The main thread's frame when the signal arrived.
+
+        '''
+
+        now = time.process_time()
+        weight = int((now - self.last) * 1000000)
+        self.last = now
+        main = threading.main_thread().ident
+        for ident, frame in sys._current_frames().items():
+            if ident == main:
+                frame = interrupted  # Skips the handler's own frame
+            if frame is None or frame.f_code.co_filename in self.IDLE_FILES:
+                continue
+            stack = []
+            stage = None
+            while frame is not None:
+                code = frame.f_code
+                stack.append(code)
+                if stage is None:
+                    stage = STAGE_FUNCTIONS.get(code.co_name)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[(stage or "other", tuple(stack))] += weight
+        return
+
+    def write(self, directory):
+        '''
+        Writes the samples to a directory: stacks.collapsed holds every sample with its stage as the root frame, in the
+        collapsed-stack format read by flamegraph.pl and speedscope; <stage>.collapsed holds one stage's samples; and
+        stages.txt lists the share of each stage and its functions with the most self and total time. Weights are CPU
+        microseconds.
+
+        Args:
+            directory (String): Output directory, created if needed.
+
+        '''
+
+        def label(code):
+            return "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+        os.makedirs(directory, exist_ok=True)
+        stages = collections.defaultdict(list)
+        for (stage, stack), count in self.samples.items():
+            stages[stage].append((stack, count))
+
+        with open(os.path.join(directory, "stacks.collapsed"), "w") as f:
+            for (stage, stack), count in sorted(self.samples.items(), key=lambda i: -i[1]):
+                f.write("{};{} {}\n".format(stage, ";".join(label(i) for i in stack), count))
+
+        total = sum(self.samples.values())
+        with open(os.path.join(directory, "stages.txt"), "w") as report:
+            for stage, stacks in sorted(stages.items(), key=lambda i: -sum(c for s, c in i[1])):
+                samples = sum(c for s, c in stacks)
+                with open(os.path.join(directory, "{}.collapsed".format(stage)), "w") as f:
+                    for stack, count in sorted(stacks, key=lambda i: -i[1]):
+                        f.write("{} {}\n".format(";".join(label(i) for i in stack), count))
+
+                own = collections.Counter()
+                inclusive = collections.Counter()
+                for stack, count in stacks:
+                    own[stack[-1]] += count
+                    for code in set(stack):
+                        inclusive[code] += count
+                report.write("{}: {:.3f} s ({:.1f}%)\n".format(stage, samples / 1e6, 100.0 * samples / total))
+                report.write("  self:\n")
+                for code, count in own.most_common(10):
+                    report.write("    {:6.1f}%  {}\n".format(100.0 * count / samples, label(code)))
+                report.write("  total:\n")
+                for code, count in inclusive.most_common(10):
+                    report.write("    {:6.1f}%  {}\n".format(100.0 * count / samples, label(code)))
+                report.write("\n")
+        return
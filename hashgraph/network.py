@@ -0,0 +1,212 @@
+"""
+The simulated Network that owns the Nodes, the key registry, the clock and the verification pool.
+"""
+
+import concurrent.futures
+import os
+import random
+import time
+
+from .crypto import verify_batch
+from .metrics import Metrics
+from .node import Node
+
+
+def now_ns():
+    '''
+    Returns the current wall-clock time in integer nanoseconds since the epoch.
+
+    '''
+
+    return int(time.time() * 1000000000)
+
+
+class WallClock:
+    """
+    Real time, used when the simulation is watched interactively.
+
+    """
+
+    def now_ns(self):
+        return now_ns()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def advance_to(self, time_ns):
+        return  # Real time already runs past anything recorded earlier
+
+
+class VirtualClock:
+    """
+    Simulated time for headless runs. Sleeping advances the clock instantly instead of blocking.
+
+    """
+
+    def __init__(self, start_ns=0):
+        self.time_ns = start_ns
+
+    def now_ns(self):
+        return self.time_ns
+
+    def sleep(self, seconds):
+        self.time_ns += int(seconds * 1000000000)
+
+    def advance_to(self, time_ns):
+        self.time_ns = max(self.time_ns, time_ns)
+
+
+class Network:
+
+    def __init__(self, headless=False, seed=None):
+        self.nodes = []
+        self.names = []  # Node names indexed by creator id
+        self.verify_keys = {}  # Key registry: creator id -> parsed VerifyKey, built once by init_nodes
+        self.active = True
+        self.headless = headless  # Headless runs use a virtual clock, never pause and print nothing
+        self.verbose = not headless
+        self.seed = seed
+        self.rng = random.Random(seed)  # Drives gossip partner choice; seeded runs are reproducible
+        self.clock = VirtualClock() if headless else WallClock()
+        self.event_cache = None  # Shared decoded Events (hash -> Event), only used by the discrete-event Simulator
+        self.executor = None  # Pool for batch signature verification, see set_verifier
+        self.verify_workers = 1
+        self.log_dir = None  # Directory of per-Node event logs, None keeps hg in memory only
+        self.keep_rounds = None  # Decided rounds of Events each Node keeps before pruning, None keeps everything
+        self.local = None  # Creator id of the only Node run by this process, None if every Node runs here
+        self.samples_per_sync = 1  # Simulated relay samples each Node takes between two of its Events
+        self.metrics = Metrics()  # Stage timings and counters of every Node in this process
+        self.trace = None  # GossipTrace recording every created Event and received sync, None records nothing
+
+    def init_nodes(self, new_nodes):
+        '''
+        SIM: Adds all of the nodes in hg_nodes to the simulated Network.
+
+        Args:
+            new_nodes (List): List containing the names (String) of each simulated Node.
+
+        '''
+
+        for i in new_nodes:
+            node_rng = random.Random(self.rng.getrandbits(64))
+            if self.seed is not None:
+                key_seed = bytes(node_rng.getrandbits(8) for j in range(32))  # Reproducible keys, so coin rounds are too
+            else:
+                key_seed = None
+            node = Node(i, len(self.nodes), node_rng, key_seed)
+            self.nodes.append(node)
+            self.names.append(i)
+            self.verify_keys[node.id] = node.signing_key.verify_key
+        return
+
+    def node_set_network(self, nw, init_events=True):
+        '''
+        Assigns each Node to the simulated Network and generates the initial, empty Event to start the Hashgraph.
+
+        Args:
+            nw (object Network): The simulated Network.
+            init_events (bool): Create the init Events; a replayed trace inserts the recorded ones instead.
+
+        '''
+
+        for i in self.nodes:
+            i.network = nw
+            for j in self.nodes:
+                i.hg[j.name] = []  # Creates empty list for each node that will contain all events
+                i.base[j.name] = 0
+                i.order_seq[j.name] = 0
+            if self.local is not None and i.id != self.local:
+                continue  # Runs in another process; only its name and key are used here
+            if self.log_dir is not None:
+                i.open_log(os.path.join(self.log_dir, i.name))  # Rebuild hg from the Node's log after a restart
+                # New Events are stamped after every recovered one, even though a virtual clock restarts at 0
+                self.clock.advance_to(max((j.timestamp for j in i.events.values()), default=0))
+            if init_events and not i.hg[i.name]:
+                i.create_event()  # Create empty init Event for each Node
+        return
+
+    def set_verifier(self, workers, processes=False):
+        '''
+        Creates the pool used to verify the signatures of received Events in batches.
+
+        Args:
+            workers (int): Number of pool workers; 0 or 1 verifies in the receiving thread.
+            processes (bool): Use a process pool instead of a thread pool.
+
+        '''
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.verify_workers = max(1, workers)
+        if workers > 1:
+            if processes:
+                self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+            else:
+                self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        return
+
+    def verify_events(self, events):
+        '''
+        Verifies the signatures of a batch of Events against the key registry.
+
+        Args:
+            events (List): Events to verify.
+
+        Returns:
+            (List): True for each Event whose signature is valid, False otherwise.
+
+        '''
+
+        start = time.perf_counter()
+        jobs = []
+        for i in events:
+            verify_key = self.verify_keys.get(i.creator)
+            jobs.append((i.encode(), i.signature, bytes(verify_key) if verify_key is not None else None))
+        results = verify_batch(jobs, self.executor, self.verify_workers)
+        if events:
+            self.metrics.observe("verify_seconds", time.perf_counter() - start)
+            self.metrics.inc("events_verified_total", len(events))
+        return results
+
+    def shutdown(self):
+        '''
+        Stops the simulated Network: listener threads exit, event logs are made durable and the verification pool is closed.
+
+        '''
+
+        self.active = False
+        for i in self.nodes:
+            if i.log is not None:
+                i.log.close()
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        return
+
+    def pause(self, seconds):
+        '''
+        Pauses so printed output can be followed. Quiet runs, including headless ones, never pause.
+
+        Args:
+            seconds (float): Length of the pause.
+
+        '''
+
+        if self.verbose:
+            time.sleep(seconds)
+        return
+
+    def print_nodes(self):
+        '''
+        Prints all of the Nodes currently connected to the simulated Network.
+
+        '''
+
+        print("\nNodes on network: {}\n".format(self))
+        for i in self.nodes:
+            print("Node:\n {}\n {}\n".format(i.name, i.signing_key.sign))
+        return
@@ -0,0 +1,1620 @@
+"""
+A hashgraph Node: gossip, round division, virtual voting, consensus order and pruning.
+"""
+
+import array
+import collections
+import hashlib
+import logging
+import queue
+import random
+import struct
+import threading
+import time
+
+from . import crypto
+from .event import ConsensusStream, Event, Fork, HASH_SIZE, NULL_HASH, SAMPLE_RECORD, SyncReport, decode_event, decode_samples, decode_sync, encode_sync, numpy, pack_sample, pack_transactions
+from .storage import EventLog, FSYNC_EVERY, Snapshot, TRACE_CREATE, encode_snapshot
+
+
+log = logging.getLogger(__name__)
+
+
+SIM = True
+SYNC_TIMEOUT = 10  # Seconds either side of a sync waits for the other before giving up
+DIVIDE_BATCH_MIN = 4096  # New Events needed before divide_rounds switches to the NumPy batch path
+DIVIDE_BATCH_NODES = 16  # With fewer Nodes the per-Event loop is already cheaper than the array operations
+INGEST_CAPACITY = 65536  # Samples a Node's ingest queue holds before producers block
+BATCH_MAX_COUNT = 1024  # Samples packed into one Event at most
+BATCH_MAX_BYTES = 64 * 1024  # Packed payload bytes of one Event at most
+
+# Every COIN_ROUNDS-th voting round is a coin round (the constant c in the Swirlds whitepaper)
+COIN_ROUNDS = 10
+
+# An unordered Event of a creator with a known fork whose round created is more than STALE_ROUNDS behind the round being
+# ordered is never received. Rounds are the same on every Node, so every Node drops it at the same point; without this a
+# side of a fork that no later Event builds on would be tested forever.
+STALE_ROUNDS = 10
+
+
+def supermajority(count, n):
+    '''
+    Checks whether count is more than two thirds of n.
+
+    Args:
+        count (int): Number of creators counted.
+        n (int): Total number of members.
+
+    Returns:
+        (bool): True if count is a supermajority of n.
+
+    '''
+
+    return 3 * count > 2 * n
+
+
+def popcount(bits):
+    '''
+    Counts the set bits of an integer bitset indexed by creator id.
+
+    Args:
+        bits (int): The bitset.
+
+    Returns:
+        (int): Number of creators in the set.
+
+    '''
+
+    return bin(bits).count("1")
+
+
+def creator_bits(events):
+    '''
+    Builds an integer bitset of the creators of the given Events.
+
+    Args:
+        events (Iterable): Events whose creators are set in the result.
+
+    Returns:
+        (int): Bitset with bit i set if creator i made one of the Events.
+
+    '''
+
+    bits = 0
+    for i in events:
+        bits |= 1 << i.creator
+    return bits
+
+
+class IngestQueue:
+    """
+    Thread-safe bounded queue of relay samples waiting for a Node's next Event. Samples queued between syncs are packed
+    into that one Event, so a signature and its gossip overhead are shared by all of them. Producers block while the
+    queue is full, so a sampler that outruns gossip is slowed down instead of growing memory without limit.
+
+    """
+
+    def __init__(self, capacity=INGEST_CAPACITY, batch_count=BATCH_MAX_COUNT, batch_bytes=BATCH_MAX_BYTES):
+        '''
+        Args:
+            capacity (int): Samples held before put blocks.
+            batch_count (int): Samples packed into one Event at most.
+            batch_bytes (int): Packed payload bytes of one Event at most.
+
+        '''
+        self.samples = collections.deque()
+        self.capacity = capacity
+        self.batch_count = batch_count
+        self.batch_bytes = batch_bytes
+        self.not_full = threading.Condition()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def put(self, sample, timeout=None):
+        '''
+        Queues a sample, waiting while the queue is full.
+
+        Args:
+            sample (bytes): One SAMPLE_RECORD built by pack_sample.
+            timeout (float): Seconds to wait for space, None to wait indefinitely and 0 not to wait.
+
+        Returns:
+            (bool): True if the sample was queued, False if the queue was still full.
+
+        Raises:
+            ValueError: If the sample is not a single sample record.
+
+        '''
+
+        if len(sample) != SAMPLE_RECORD.size:
+            raise ValueError("A sample record is {} bytes, not {}".format(SAMPLE_RECORD.size, len(sample)))
+        with self.not_full:
+            if not self.not_full.wait_for(lambda: len(self.samples) < self.capacity, timeout):
+                return False
+            self.samples.append(sample)
+        return True
+
+    def take(self):
+        '''
+        Removes the oldest samples that fit within the batch limits and packs them into one payload.
+
+        Returns:
+            (bytes): The packed payload, or None if no samples are queued.
+
+        '''
+
+        batch = []
+        size = 0
+        with self.not_full:
+            while self.samples and len(batch) < self.batch_count and size + SAMPLE_RECORD.size <= self.batch_bytes:
+                batch.append(self.samples.popleft())
+                size += SAMPLE_RECORD.size
+            if batch:
+                self.not_full.notify_all()
+        return pack_transactions(batch) if batch else None
+
+
+class ForkHeads:
+    """
+    Exact ancestry tests against the Events of one creator with a known fork, for find_order. An Event with both sides
+    of the fork among its ancestors sees none of the creator's Events, but is still a descendant of them; which ones is
+    decided by its heads, the latest ancestors by the creator on each side of the fork. Heads are found once per Event
+    and kept for the lifetime of the object, so one find_order call searches each part of the hashgraph only once.
+    Events older than floor are never asked about, so the search stops there.
+
+    """
+
+    def __init__(self, node, creator, floor):
+        '''
+        Args:
+            node (object Node): The Node whose hashgraph is searched.
+            creator (int): Creator id of the forked creator.
+            floor (int): Lowest sequence number of the creator's Events that will be tested.
+
+        '''
+        self.node = node
+        self.creator = creator
+        self.floor = floor
+        self.memo = {}  # Event hash -> tuple of its heads
+
+    def heads(self, x):
+        '''
+        Finds the latest ancestors of Event x (or x itself) by the creator, one per side of its forks, leaving out any
+        below floor.
+
+        Args:
+            x (object Event): The later Event.
+
+        Returns:
+            (tuple): The head Events.
+
+        '''
+
+        node = self.node
+        creator = self.creator
+        memo = self.memo
+        stack = [x]
+        while stack:
+            z = stack[-1]
+            if z.hash in memo:
+                stack.pop()
+                continue
+            if not z.fk >> creator & 1:
+                tip = node.tip(z, creator)
+                memo[z.hash] = (tip,) if tip is not None and tip.seq >= self.floor else ()
+                stack.pop()
+                continue
+            parents = [p for p in (node.events.get(z.sp), node.events.get(z.op)) if p is not None and p.la[creator] >= self.floor]
+            pending = [p for p in parents if p.hash not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            candidates = {}
+            if z.creator == creator:
+                candidates[z.hash] = z
+            for p in parents:
+                candidates.update((h.hash, h) for h in memo[p.hash])
+            # Drop every candidate that is a self-ancestor of another one
+            ranked = sorted(candidates.values(), key=lambda i: -i.seq)
+            heads = []
+            for h in ranked:
+                if not any(node.same_branch(i, h) for i in heads if i.seq > h.seq):
+                    heads.append(h)
+            memo[z.hash] = tuple(heads)
+        return memo[x.hash]
+
+    def ancestor(self, x, y):
+        '''
+        Checks whether Event y, by the creator, is an ancestor of (or is) Event x.
+
+        Args:
+            x (object Event): The later Event.
+            y (object Event): An Event by the creator, not below floor.
+
+        Returns:
+            (bool): True if y is an ancestor of x.
+
+        '''
+
+        if x.la[self.creator] < y.seq:
+            return False
+        if not x.fk >> self.creator & 1:
+            return self.node.sees(x, y)
+        return any(h.seq >= y.seq and self.node.same_branch(h, y) for h in self.heads(x))
+
+
+class Node:
+
+    def __init__(self, name, node_id=0, rng=None, key_seed=None):
+        self.name = name
+        self.id = node_id # Creator id used in the canonical Event encoding
+        self.rng = rng or random.Random()  # Source of simulated relay samples, and of gossip partners when the Node runs in its own process
+        self.signing_key = crypto.signing_key(key_seed)
+        self.hg = {}# HG Struct: Dictionary containing lists pertaining to keys with names of Nodes
+        self.base = {}  # Sequence number of the first Event kept in each hg list; earlier Events have been pruned
+        self.events = {}# Index of every Event in hg by content hash, kept in insertion (topological) order
+        self.sync_inbox = queue.Queue()  # Incoming (sender, replies, packets) sync requests for simulation
+        self.transport = None  # TCP Transport used when SIM is False
+        self.ingest = IngestQueue()  # Relay samples waiting to be packed into the Node's next Event
+        self.last_sync = None  # SyncReport for the most recent sync this node initiated
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.rejected = 0  # Received Events dropped for a bad signature or a rejected parent
+        self.log = None  # EventLog every inserted Event is appended to
+        self.network = None  # Simulated network
+        self.observer = True  # Runs consensus; large simulations can leave most Nodes as gossip-only
+        self.new_events = []  # Events inserted since the last call to divide_rounds
+        self.witnesses = {}  # Round -> {hash: witness Event}
+        self.famous = {}  # Witness hash -> True/False once its fame is decided
+        self.fame_round = 1  # Lowest round whose witnesses are not all decided
+        self.order_round = 1  # Next decided round to assign as round received
+        self.order_seq = {}  # Sequence number of the first Event in each hg list without a round received
+        self.unordered_forked = []  # Events of creators with a known fork without a round received, in insertion order
+        self.consensus = []  # (round received, consensus timestamp, Event) in consensus order
+        self.consensus_base = 0  # Consensus position of consensus[0]
+        self.pruned_round = 0  # Highest round received whose Events have been pruned
+        self.snapshot_digest = NULL_HASH  # Running digest of the pruned part of the consensus order
+        self.snapshot = None  # Signed Snapshot of the pruned part of hg, None until the first prune
+        self.forks = {}  # Creator id -> Fork evidence for the first fork seen by that creator
+        self.forkers = 0  # Bitset of creators with a known fork; only their Events need the exact checks of sees
+        self.twins = []  # Inserted Events that fork their creator's chain; kept in events but not in hg
+        self.fork_slots = set()  # (creator id, sequence number) of every slot held by more than one Event
+        self.suspects = {}  # Creator id -> sequence number of a forked Event not received yet, requested again on sync
+        self.byzantine = False  # Simulation only: gossip a forked copy of the latest own Event to odd-numbered Nodes
+        self.forged = {}  # Hash of an own Event -> the signed twin gossiped in its place when byzantine
+    def print_hashgraph(self):
+
+        for i in self.network.nodes:
+            print("Node: {}".format(i.name))
+            print(self.hg[i.name])
+            print("\n\n")
+
+    def create_event(self, data=None, sync_node=None):
+        '''
+        Creates a single Event on the Hashgraph IAW the Swirlds Whitepaper. Appends the new Event to the current Node's Hashgraph.
+
+        Args:
+            data (String): Contains sampled relay data.
+            sync_node (object Node): The target Node that is sending the new Hashgraph data.
+
+        '''
+        #pdb.set_trace()
+        if (len(self.hg[self.name]) != 0):
+            # If not the init Event, generate hashes for the self- and other-parent Events
+            sp_hash = self.hg[self.name][-1].hash
+            op_hash = self.hg[sync_node.name][-1].hash
+        else:
+            # If init Event, no parent events Exist
+            sp_hash = None
+            op_hash = None
+
+        if isinstance(data, str):
+            data = data.encode()
+
+        timestamp = self.network.clock.now_ns()
+        new_event = Event(timestamp, data, sp_hash, op_hash, self.name, self.id, self.base[self.name] + len(self.hg[self.name]))
+        new_event.signature = self.sign_event(new_event)
+        new_event.verified = True
+
+        self.insert_event(new_event)
+        if self.network.trace is not None:
+            self.network.trace.event(new_event, timestamp, TRACE_CREATE)
+
+        return
+
+    def insert_event(self, event):
+        '''
+        Adds an Event to the current Node's Hashgraph and to the hash index. Parents are looked up by hash, so duplicate
+        detection and parent lookup are O(1) per Event. Each hg list is indexed by sequence number, so an Event whose slot
+        in its creator's chain is already taken by a different Event is a fork, found with the same single lookup.
+
+        Args:
+            event (object Event): The Event to insert. Both of its parents must already be known.
+
+        Returns:
+            (bool): True if the Event was inserted, False if it was already known.
+
+        Raises:
+            ValueError: If a parent is unknown or the Event skips sequence numbers of its creator.
+
+        '''
+
+        if event.hash in self.events or event.seq < self.base[event.node_name]:
+            return False
+        chain = self.hg[event.node_name]
+        index = event.seq - self.base[event.node_name]
+        if index > len(chain):
+            raise ValueError("Event {} skips sequence numbers of creator {}".format(event.hash.hex(), event.creator))
+        for parent in (event.sp, event.op):
+            if parent is not None and parent not in self.events:
+                if parent == event.sp and index > 0:
+                    # The self-parent's slot holds another Event, so the creator forked there; ask for the other one
+                    self.suspects[event.creator] = event.seq - 1
+                raise ValueError("Event {} references unknown parent {}".format(event.hash.hex(), parent.hex()))
+
+        if index < len(chain):
+            # The slot is taken by another Event: keep the twin by hash so its descendants can still be placed
+            self.twins.append(event)
+            self.fork_slots.add((event.creator, event.seq))
+            self.suspects.pop(event.creator, None)
+            self.record_fork(chain[index], event)
+
+        # Ancestry vector is the element-wise max of the parents' vectors, so no graph walk is ever needed.
+        # It depends only on the Event's ancestors, so an Event shared between simulated Nodes keeps the first result.
+        self_parent = self.events.get(event.sp)
+        other_parent = self.events.get(event.op)
+        if event.la is None:
+            if self_parent is not None:
+                event.la = array.array("i", self_parent.la)
+                event.height = self_parent.height + 1
+                event.fk = self_parent.fk
+            else:
+                event.la = array.array("i", [-1]) * len(self.network.names)
+            if other_parent is not None:
+                event.la = array.array("i", [i if i > j else j for i, j in zip(event.la, other_parent.la)])
+                event.height = max(event.height, other_parent.height + 1)
+                event.fk |= other_parent.fk
+            event.la[event.creator] = event.seq
+        if self.forkers:
+            self.track_forks(event, self_parent, other_parent)
+
+        if index == len(chain):
+            chain.append(event)
+        self.events[event.hash] = event
+        if self.log is not None:
+            self.log.append(event)
+        if self.observer:
+            self.new_events.append(event)
+            if self.forkers >> event.creator & 1:
+                self.unordered_forked.append(event)
+        return True
+
+    def track_forks(self, event, self_parent, other_parent):
+        '''
+        Records on an Event, for each creator with a known fork, its latest ancestor by that creator, and whether its two
+        parents lead back to different sides of a fork by that creator, in which case the Event sees no Event of that
+        creator. Both depend only on the Event's ancestors. An Event inserted before any fork by a creator was held has
+        no such record for it and needs none: all its ancestors by that creator are in the creator's hg list.
+
+        Args:
+            event (object Event): The Event being inserted.
+            self_parent (object Event): Its self-parent, None for an init Event.
+            other_parent (object Event): Its other-parent, None for an init Event.
+
+        '''
+
+        tips = event.tips or {}
+        for creator in range(len(self.network.names)):
+            if not self.forkers >> creator & 1 or creator in tips:
+                continue
+            theirs = self.tip(other_parent, creator) if other_parent is not None else None
+            if creator == event.creator:
+                # The other-parent's latest Event by the creator has to be an earlier Event of this chain
+                tip = event
+                if theirs is not None and (theirs.seq >= event.seq or not self.same_branch(self_parent, theirs)):
+                    event.fk |= 1 << creator
+            else:
+                tip = self.tip(self_parent, creator) if self_parent is not None else None
+                if tip is None or theirs is not None and theirs.seq > tip.seq:
+                    tip, theirs = theirs, tip
+                if theirs is not None and not self.same_branch(tip, theirs):
+                    event.fk |= 1 << creator
+            if tip is not None:
+                tips[creator] = tip.hash
+        event.tips = tips
+        return
+
+    def tip(self, x, creator):
+        '''
+        Finds the latest ancestor of Event x (or x itself) by a creator. Only meaningful if x sees no fork by the creator.
+
+        Args:
+            x (object Event): The later Event.
+            creator (int): Creator id.
+
+        Returns:
+            (object Event): The ancestor, None if x has none or it has been pruned.
+
+        '''
+
+        if x.creator == creator:
+            return x
+        if x.tips is not None and creator in x.tips:
+            return self.events.get(x.tips[creator])
+        name = self.network.names[creator]
+        seq = x.la[creator]
+        if seq < self.base[name]:
+            return None
+        return self.hg[name][seq - self.base[name]]
+
+    def same_branch(self, a, b):
+        '''
+        Checks whether two Events by the same creator lie on one chain, i.e. the earlier one is a self-ancestor of the other.
+
+        Args:
+            a (object Event): One Event.
+            b (object Event): An Event by the same creator.
+
+        Returns:
+            (bool): True if neither Event forks the other's chain.
+
+        '''
+
+        if a.seq < b.seq:
+            a, b = b, a
+        while a is not None and a.seq > b.seq:
+            a = self.events.get(a.sp)
+        return a is not None and a.hash == b.hash
+
+    def sees(self, x, y):
+        '''
+        Checks whether Event x sees Event y, as in the Swirlds whitepaper: y is an ancestor of (or is) x, and no fork by
+        y's creator is among the ancestors of x. The ancestry vector decides this on its own unless another Event with
+        y's sequence number is held; then the self-parents of x's latest Event by that creator are followed back to it.
+
+        Args:
+            x (object Event): The later Event.
+            y (object Event): The earlier Event.
+
+        Returns:
+            (bool): True if x sees y.
+
+        '''
+
+        if x.la[y.creator] < y.seq:
+            return False
+        if not self.forkers >> y.creator & 1:
+            return True
+        if x.fk >> y.creator & 1:
+            return False
+        if (y.creator, y.seq) not in self.fork_slots:
+            return True
+        tip = self.tip(x, y.creator)
+        return tip is not None and self.same_branch(tip, y)
+
+    def strongly_seen(self, x, candidates):
+        '''
+        Finds which candidate Events are strongly seen by Event x, i.e. seen through Events by a supermajority of creators.
+        Each creator's latest ancestor of x is looked up directly from the ancestry vector, so each candidate costs O(N).
+        Creators with a fork among the ancestors of x are left out as the creators seen through, since x sees none of
+        their Events.
+
+        Args:
+            x (object Event): The Event doing the seeing.
+            candidates (Iterable): Events (normally the witnesses of one round) to test.
+
+        Returns:
+            (List): The candidates that x strongly sees.
+
+        '''
+
+        n = len(self.network.names)
+        forkers = self.forkers
+        if forkers:
+            candidates = [y for y in candidates if self.sees(x, y)]
+        else:
+            candidates = [y for y in candidates if x.la[y.creator] >= y.seq]
+        if not candidates:
+            return []
+        # A pruned frontier Event is too old to see any witness still being tested
+        frontier = []
+        for creator, seq in enumerate(x.la):
+            if forkers >> creator & 1:
+                if not x.fk >> creator & 1:
+                    z = self.tip(x, creator)
+                    if z is not None:
+                        frontier.append(z)
+                continue
+            name = self.network.names[creator]
+            if seq >= self.base[name]:
+                frontier.append(self.hg[name][seq - self.base[name]])
+        needed = 2 * n // 3 + 1
+        seen = []
+        las = [z.la for z in frontier]
+        for y in candidates:
+            if forkers >> y.creator & 1:
+                if sum(1 for z in frontier if self.sees(z, y)) >= needed:
+                    seen.append(y)
+                continue
+            count = 0
+            left = len(las)
+            for la in las:
+                left -= 1
+                if la[y.creator] >= y.seq:
+                    count += 1
+                    if count >= needed:
+                        seen.append(y)
+                        break
+                elif count + left < needed:
+                    break
+        return seen
+
+    def strongly_sees(self, x, y):
+        '''
+        Checks whether Event x strongly sees Event y.
+
+        Args:
+            x (object Event): The later Event.
+            y (object Event): The earlier Event.
+
+        Returns:
+            (bool): True if x strongly sees y.
+
+        '''
+
+        return len(self.strongly_seen(x, [y])) == 1
+
+    def open_log(self, path, fsync_every=FSYNC_EVERY):
+        '''
+        Opens the Node's on-disk event log, rebuilding hg from it, and appends every Event inserted from then on.
+
+        Args:
+            path (String): Directory of the Node's log.
+            fsync_every (int): Number of appended records per fsync.
+
+        Returns:
+            (int): The number of Events recovered from the log.
+
+        '''
+
+        log = EventLog(path, fsync_every)
+        recovered = 0
+        for signature, body in log.replay():
+            event = decode_event(body, self.network.names)
+            event.signature = bytes(signature)
+            event.verified = True  # Only verified Events are ever logged
+            self.insert_event(event)
+            recovered += 1
+        self.log = log
+        return recovered
+
+    def known_counts(self):
+        '''
+        Lists how many Events the current Node holds for each creator, i.e. one more than the highest sequence number known.
+        For a creator suspected of forking, the count stops before the Event whose twin is missing, so that the sender
+        sends it again.
+
+        Returns:
+            (List): Event counts indexed by creator id.
+
+        '''
+
+        counts = [self.base[i] + len(self.hg[i]) for i in self.network.names]
+        for creator, seq in self.suspects.items():
+            counts[creator] = min(counts[creator], max(seq, self.base[self.network.names[creator]]))
+        return counts
+
+    def record_fork(self, first, second):
+        '''
+        Records that a creator signed two different Events with the same sequence number. The first fork seen by each
+        creator is kept as evidence; both signed Events of every fork are gossiped to each Node that does not hold both
+        yet, so the other Nodes find the fork themselves. From then on the creator's Events are checked by sees against
+        their exact ancestry, and they are ordered one by one since the creator's hg list now mixes both sides of the fork.
+
+        Args:
+            first (object Event): The Event already in the creator's chain.
+            second (object Event): The Event that forks it.
+
+        '''
+
+        if first.creator in self.forks:
+            return
+        self.forks[first.creator] = Fork(first.creator, first.seq, first, second)
+        self.forkers |= 1 << first.creator
+        if self.observer:
+            name = first.node_name
+            self.unordered_forked.extend(self.hg[name][self.order_seq[name] - self.base[name]:])
+        self.network.metrics.inc("forks_detected_total")
+        log.warning("Node %s detected a fork by node %s at sequence number %d", self.name, first.node_name, first.seq)
+        return
+
+    def events_since(self, known, target=None, slots=()):
+        '''
+        Collects the Events that another Node is missing, given that Node's per-creator counts and fork slots. Both Events
+        of every fork still held are included unless the receiver already holds both, since counts cannot tell the
+        receiver's copy of a slot from the sender's; the receiver skips whatever it already holds.
+
+        Args:
+            known (List): Output of known_counts() on the receiving Node.
+            target (object Node): The receiving Node, only needed to simulate a byzantine sender.
+            slots (Set): fork_slots of the receiving Node, whose twins it already holds.
+
+        Returns:
+            (List): The missing Events in topological order.
+
+        '''
+
+        missing = []
+        for creator, name in enumerate(self.network.names):
+            missing.extend(self.hg[name][max(0, known[creator] - self.base[name]):])
+        if self.twins:
+            sent = set(i.hash for i in missing)
+            for twin in self.twins:
+                if (twin.creator, twin.seq) in slots:
+                    continue
+                pair = [twin]
+                if twin.seq >= self.base[twin.node_name]:
+                    pair.append(self.hg[twin.node_name][twin.seq - self.base[twin.node_name]])
+                missing.extend(i for i in pair if i.hash not in sent)
+                sent.update(i.hash for i in pair)
+        if self.byzantine and target is not None and target.id % 2:
+            latest = self.hg[self.name][-1]
+            missing = [self.forge(i) if i is latest else i for i in missing]
+        missing.sort(key=lambda event: event.height)  # Parents always have a smaller height than their children
+        return missing
+
+    def forge(self, event):
+        '''
+        Signs a twin of one of the current Node's own Events: same parents and sequence number, later timestamp. Only used
+        to simulate a byzantine Node. The twin is made once per Event, so every Node it is sent to gets the same one.
+
+        Args:
+            event (object Event): The Event to fork.
+
+        Returns:
+            (object Event): The signed twin.
+
+        '''
+
+        twin = self.forged.get(event.hash)
+        if twin is None:
+            twin = Event(event.timestamp + 1, event.data, event.sp, event.op, event.node_name, event.creator, event.seq)
+            twin.signature = self.sign_event(twin)
+            twin.verified = True
+            self.forged[event.hash] = twin
+        return twin
+
+    def receive_sync(self, sender, packet):
+        '''
+        Inserts the Events from a sync packet that are not already known and creates the new Event that records the sync.
+        Signatures of the new Events are verified as one batch first; Events that fail, and any Events built on them, are
+        rejected before they reach hg.
+
+        Args:
+            sender (object Node): The Node that sent the packet.
+            packet (bytes): Sync packet built by encode_sync.
+
+        Returns:
+            (int): The number of Events that were new to the current Node.
+
+        '''
+
+        events = decode_sync(packet, self.network.names, self.network.event_cache)
+        if self.network.trace is not None:
+            self.network.trace.sync(self.network.clock.now_ns(), sender.id, self.id, events)
+        unverified = [i for i in events if not i.verified and i.hash not in self.events]
+        for event, valid in zip(unverified, self.network.verify_events(unverified)):
+            event.verified = valid
+        rejected = self.rejected
+        self.rejected += sum(1 for i in unverified if not i.verified)
+
+        received = 0
+        for i in events:
+            if not i.verified or i.hash in self.events:
+                continue
+            try:
+                self.insert_event(i)
+            except ValueError:
+                # A parent was rejected, so this Event cannot be placed either
+                self.rejected += 1
+                continue
+            received += 1
+        if self.rejected > rejected:
+            self.network.metrics.inc("events_rejected_total", self.rejected - rejected)
+
+        # Simulated relay sampling; a real sampler feeds self.ingest from its own thread
+        dropped = 0
+        for i in range(self.network.samples_per_sync):
+            if not self.ingest.put(self.generate_random_data(), timeout=0):
+                dropped += 1  # This thread also empties the queue, so waiting for space would never end
+        if dropped:
+            self.network.metrics.inc("samples_dropped_total", dropped)
+            log.info("Node %s dropped %d samples: its ingest queue is full", self.name, dropped)
+
+        if not self.hg[sender.name]:
+            # Every Event of the sender was rejected and none is held from earlier, so there is no other-parent. The queued
+            # samples wait for the next sync.
+            log.info("Node %s holds no event of node %s; no sync event created", self.name, sender.name)
+            return received
+
+        # Create new event after receiving the sender's events to finish sync. It carries every queued sample that fits.
+        self.create_event(data=self.ingest.take(), sync_node=sender)
+        return received
+
+    def generate_random_data(self):  # TODO: replace with relay sampling in the actual implementation
+        '''
+        Generates random data to simulate sampling a relay in the microgrid.
+
+        Returns:
+            (bytes): The simulated sample as a SAMPLE_RECORD, with the Node's id as the relay id.
+
+        '''
+
+        current = [self.rng.uniform(30, 50) for i in range(3)]
+        voltage = [self.rng.uniform(20, 40) for i in range(3)]
+        return pack_sample(self.network.clock.now_ns(), self.id, current, voltage)
+
+    def sign_event(self, event):
+        '''
+        Signs the canonical encoding of the event created or agreed upon by the member. The verify key is not attached;
+        other members look it up by creator id in the Network's key registry.
+
+        Args:
+            event (object Event): Event object to be signed by the member.
+
+        Returns:
+            (bytes): The detached 64-byte signature.
+
+        '''
+
+        # Only the fixed-layout encoding is signed, never the parent objects or the rest of the hashgraph
+        obj_string = event.encode()
+
+        # Hash the event obj string
+        signed = self.signing_key.sign(obj_string)
+
+        return signed.signature
+
+    def verify_event(self, event):
+        '''
+        Verifies the event's detached signature over its canonical encoding with the creator's key from the registry.
+
+        Args:
+            event (class Event): The event to be verified.
+
+        Returns:
+            (int): Value -1 for bad signature, 0 for successful verification.
+
+        '''
+
+        verify_key = self.network.verify_keys.get(event.creator)
+        if verify_key is None or not crypto.verify(verify_key, event.encode(), event.signature):
+            return -1
+        return 0
+
+    def find_targ_idx(self, node):
+        '''
+        Returns the index of a given node name in the current node's hashgraph.
+
+        Args:
+            node (String): The name of the node whose index you wish to return
+
+        Returns:
+            (Int): Index of the target node in the current node's hashgraph.
+
+        '''
+
+        targ_idx = 0
+        for i in self.network.nodes:
+            if i.name == targ_node:
+                break
+            targ_idx += 1
+
+        return targ_idx
+
+    def record_sync(self, targ_node, missing, packet, seconds=None):
+        '''
+        Updates the sync counters and metrics after the current Node has sent Events to another Node.
+
+        Args:
+            targ_node (String): The name of the Node that received the Events.
+            missing (List): The Events that were sent.
+            packet (bytes): The sync packet that carried them.
+            seconds (float): Duration of the sync, None if it is not known when the packet is sent.
+
+        Returns:
+            (SyncReport): Counters for the sync.
+
+        '''
+
+        self.last_sync = SyncReport(self.name, targ_node, len(missing), len(packet))
+        self.events_sent += len(missing)
+        self.bytes_sent += len(packet)
+
+        metrics = self.network.metrics
+        metrics.inc("syncs_total")
+        metrics.inc("events_sent_total", len(missing))
+        metrics.inc("bytes_sent_total", len(packet))
+        metrics.observe("sync_events", len(missing))
+        metrics.observe("sync_bytes", len(packet))
+        if seconds is not None:
+            metrics.observe("sync_seconds", seconds)
+        return self.last_sync
+
+    def sync(self, target):
+        '''
+        Syncs with another Node directly from the calling thread, without the queued handshake. Headless runs drive every
+        Node from a single thread this way.
+
+        Args:
+            target (object Node): The Node receiving the Events.
+
+        Returns:
+            (SyncReport): Counters for the sync.
+
+        '''
+
+        start = time.perf_counter()
+        if target.needs_bootstrap(self):
+            target.bootstrap(self)
+        missing = self.events_since(target.known_counts(), target, target.fork_slots)
+        packet = encode_sync(missing)
+        target.receive_sync(self, packet)
+        return self.record_sync(target.name, missing, packet, time.perf_counter() - start)
+
+    def begin_sync(self, targ_node, timeout=SYNC_TIMEOUT):
+        '''
+        Begins syncing with another Node. Sends only the Events the receiving Node does not know yet. The handshake runs
+        over queues, so both sides block without using CPU while they wait for each other.
+
+        Args:
+            targ_node (String): The name of the Node being synced with.
+            timeout (float): Seconds to wait for each reply from the receiving Node.
+
+        Returns:
+            (SyncReport): Counters for the sync, or None if the receiving Node did not answer in time.
+
+        '''
+
+        if SIM:
+
+            # Simulate fetching data from relay (while allowing script to demonstrate algorithm execution by waiting)
+            log.info("Syncing with node: %s... ", targ_node)
+            self.network.clock.sleep(2)
+            start = time.perf_counter()
+
+            # Send the receiving node a sync request
+            # Also, fix this so you send flag data to another node in the actual implementation
+
+            #searches through nodes to find one with matching name
+            targ_idx = 0
+            #pdb.set_trace()
+            for i in self.network.nodes:
+                if i.name == targ_node:
+                    break
+                targ_idx += 1
+            target = self.network.nodes[targ_idx]
+
+            replies = queue.Queue()
+            packets = queue.Queue()
+            target.sync_inbox.put((self, replies, packets))
+
+            try:
+                # The receiver replies with its highest known sequence number per creator and the fork slots it holds, so
+                # only missing Events are sent
+                known, slots = replies.get(timeout=timeout)
+                missing = self.events_since(known, target, slots)
+                packet = encode_sync(missing)
+
+                # ACTUAL IMPLEMENTATION: Use sockets to send the packet to the receiver
+                packets.put(packet)
+
+                # Wait for the receiving node to finish syncing on their end
+                replies.get(timeout=timeout)
+            except queue.Empty:
+                log.warning("Sync with node %s timed out", targ_node)
+                return None
+
+            return self.record_sync(targ_node, missing, packet, time.perf_counter() - start)
+
+        else:
+
+            # The Transport's event loop runs the sync; this thread only waits for the result
+            import asyncio  # Already loaded by the Transport; not imported with the module so simulations never load it
+            try:
+                return self.transport.call(self.transport.sync(targ_node), timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, struct.error, ValueError) as error:
+                log.info("Sync with node %s failed: %r", targ_node, error)
+
+        return None
+
+    def wait_sync(self, timeout=SYNC_TIMEOUT):
+        '''
+        Waits for another Node to begin syncing. Inserts the new Events sent by that Node and creates the sync Event.
+
+        Args:
+            timeout (float): Seconds to wait for a sync request, and then for the sender's Events.
+
+        Returns:
+            (bool): True if a sync was completed, False if no sync arrived in time.
+
+        '''
+
+        if SIM:
+
+            # Wait for a sending node to initiate a sync request
+            try:
+                sender, replies, packets = self.sync_inbox.get(timeout=timeout)
+            except queue.Empty:
+                return False
+
+            #print("Node: {}, Connection Established from sender".format(self.name))
+            replies.put((self.known_counts(), set(self.fork_slots)))
+
+            #print("Comparing graphs...")
+            self.network.clock.sleep(2)
+            try:
+                packet = packets.get(timeout=timeout)
+            except queue.Empty:
+                log.warning("Node %s stopped sending", sender.name)
+                return False
+            self.receive_sync(sender, packet)
+
+            #print("Sync complete")
+            replies.put(True)
+            return True
+
+        else:
+
+            # Inbound syncs are served by the Transport's event loop as they arrive; wait for the next one to finish
+            try:
+                self.transport.completed.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            return True
+
+        return False
+
+    def serve(self):
+        '''
+        Answers sync requests until the simulated Network is shut down. Each wait blocks on the sync inbox, so an idle
+        Node uses no CPU.
+
+        '''
+
+        while self.network.active:
+            self.wait_sync()
+        return
+
+    def divide_rounds(self):
+        '''
+        Assigns a round and witness flag to every Event inserted since the last call. An Event's round is the highest round
+        of its parents, plus one if it strongly sees a supermajority of that round's witnesses. Ancestry vectors make this
+        a fixed amount of work per new Event for a given number of Nodes.
+
+        '''
+
+        #pdb.set_trace()
+        start = time.perf_counter()
+        debug = log.isEnabledFor(logging.DEBUG)
+        n = len(self.network.names)
+        # The batch path only compares ancestry vectors, which decide sees exactly while no fork is held
+        if not self.forkers and n >= DIVIDE_BATCH_NODES and len(self.new_events) >= DIVIDE_BATCH_MIN and numpy() is not None:
+            self.divide_rounds_batch()  # Fills in round, witness and ss; the loop below then only records witnesses
+        for i in self.new_events:
+            # Rounds depend only on ancestry, so an Event shared between simulated Nodes is only divided once
+            if i.round is None:
+                self_parent = self.events.get(i.sp)
+                other_parent = self.events.get(i.op)
+
+                # Start from the highest round of the parents
+                round = 1
+                if self_parent is not None:
+                    round = max(round, self_parent.round)
+                if other_parent is not None:
+                    round = max(round, other_parent.round)
+
+                # Move to the next round if the Event strongly sees a supermajority of this round's witnesses
+                witnesses = self.witnesses.get(round, {})
+                if supermajority(len(self.strongly_seen(i, witnesses.values())), n):
+                    round += 1
+                i.round = round
+
+                # The first Event of a creator in a round is a witness
+                i.witness = self_parent is None or i.round > self_parent.round
+                if i.witness and i.round > 1:
+                    i.ss = creator_bits(self.strongly_seen(i, self.witnesses.get(i.round - 1, {}).values()))
+
+            # Both Events of a fork can be witnesses of the same round, so witnesses are kept by hash
+            if i.witness:
+                self.witnesses.setdefault(i.round, {})[i.hash] = i
+                if i.round < self.fame_round:
+                    # Witnesses discovered after their round was decided can never be famous
+                    self.famous[i.hash] = False
+
+            if debug:
+                log.debug("\n\nround= %s\nnumber= %s\nwitness= %s\n\n", i.round, i, i.witness)
+        self.new_events = []
+        self.network.metrics.observe("divide_rounds_seconds", time.perf_counter() - start)
+        self.network.pause(2)
+        return
+
+    def divide_rounds_batch(self):
+        '''
+        Assigns rounds, witness flags and strongly-seen sets to every undivided Event at once with NumPy, for catching up
+        after a large sync or log replay. Gives exactly the results of the per-Event loop in divide_rounds.
+
+        Rather than visiting Events one by one, it works a round at a time. Strongly seeing a supermajority of a round's
+        witnesses only becomes true further along a creator's chain, so the Events of round r in each chain run up to the
+        first one that does, found by a binary search done for all chains together. The witnesses of round r are the first
+        undivided Events of the chains that do not; they are tested together against all of those first Events, since an
+        Event that strongly sees one of them has already moved past round r. Every test is an array lookup in a table of
+        the ancestry vectors of all held Events.
+
+        '''
+
+        np = numpy()
+        names = self.network.names
+        n = len(names)
+        needed = 2 * n // 3 + 1
+        chains = [self.hg[i] for i in names]
+        base = np.array([self.base[i] for i in names], dtype=np.int64)
+        offsets = np.zeros(n, dtype=np.int64)  # Table row of each chain's first held Event
+        offsets[1:] = np.cumsum([len(i) for i in chains])[:-1]
+        table = np.frombuffer(b"".join(e.la.tobytes() for chain in chains for e in chain), dtype=np.intc).reshape(-1, n)
+
+        def strongly_seen(rows, witnesses):
+            # Bool matrix: does the Event in each row strongly see each witness
+            creators = np.array([i.creator for i in witnesses], dtype=np.int64)
+            seqs = np.array([i.seq for i in witnesses], dtype=np.int64)
+            frontier = table[rows]
+            held = frontier >= base  # Pruned frontier Events are too old to see any of the witnesses
+            frontier = np.where(held, offsets + frontier - base, 0)
+            seen = (table[frontier][:, :, creators] >= seqs) & held[:, :, None]
+            return np.count_nonzero(seen, axis=1) >= needed
+
+        def advances(rows, witnesses):
+            if not witnesses or len(rows) == 0:
+                return np.zeros(len(rows), dtype=bool)
+            return 3 * np.count_nonzero(strongly_seen(rows, witnesses), axis=1) > 2 * n
+
+        # First undivided Event of each chain; undivided Events are always the end of a chain
+        start = []
+        for chain in chains:
+            k = len(chain)
+            while k > 0 and chain[k - 1].round is None:
+                k -= 1
+            start.append(k)
+        if all(start[c] == len(chains[c]) for c in range(n)):
+            return
+        r = min(chains[c][start[c] - 1].round if start[c] > 0 else 1 for c in range(n) if start[c] < len(chains[c]))
+
+        previous = list(self.witnesses.get(r - 1, {}).values())
+        while any(start[c] < len(chains[c]) for c in range(n)):
+            witnesses = dict(self.witnesses.get(r, {}))
+            candidates = [c for c in range(n) if start[c] < len(chains[c]) and (start[c] == 0 or chains[c][start[c] - 1].round < r)]
+            rows = offsets[candidates] + np.array([start[c] for c in candidates], dtype=np.int64)
+            up = advances(rows, list(witnesses.values()) + [chains[c][start[c]] for c in candidates])
+            new = [chains[c][start[c]] for c, u in zip(candidates, up) if not u]
+            for w in new:
+                witnesses[w.hash] = w
+                w.witness = True
+            if new and r > 1 and previous:
+                for w, seen in zip(new, strongly_seen(rows[~up], previous)):
+                    w.ss = creator_bits(y for y, s in zip(previous, seen) if s)
+
+            # Binary search each chain for its first Event that strongly sees a supermajority of this round's witnesses
+            low = np.array(start, dtype=np.int64)
+            high = np.array([len(i) for i in chains], dtype=np.int64)
+            while True:
+                active = np.nonzero(low < high)[0]
+                if len(active) == 0:
+                    break
+                mid = (low[active] + high[active]) // 2
+                up = advances(offsets[active] + mid, list(witnesses.values()))
+                high[active[up]] = mid[up]
+                low[active[~up]] = mid[~up] + 1
+
+            for c in range(n):
+                for i in chains[c][start[c]:low[c]]:
+                    i.round = r
+                start[c] = int(low[c])
+            previous = list(witnesses.values())
+            r += 1
+        return
+
+    def decide_fame(self):
+        '''
+        Decides which witnesses are famous by virtual voting, as in the Swirlds whitepaper. Witnesses of round r+1 vote yes
+        if they see a round r witness; later witnesses vote with the majority of the previous-round witnesses they strongly
+        see. Votes and strongly-seen sets are integer bitsets indexed by creator id, so a tally is a popcount. A creator
+        with two witnesses in a round, the two sides of a fork, has their votes kept by hash instead; an Event strongly
+        sees at most one of them, the one it sees. Only rounds that are not yet fully decided are visited.
+
+        '''
+
+        log.debug("Deciding fame:")
+
+        start = time.perf_counter()
+        n = len(self.network.names)
+        if not self.witnesses:
+            return
+        max_round = max(self.witnesses)
+
+        # Bitset of the creators with more than one witness in each round
+        twinned = collections.defaultdict(int)
+        if self.forkers:
+            for r in range(self.fame_round, max_round + 1):
+                seen = 0
+                for i in self.witnesses.get(r, {}).values():
+                    if seen >> i.creator & 1:
+                        twinned[r] |= 1 << i.creator
+                    seen |= 1 << i.creator
+
+        for r in range(self.fame_round, max_round):
+            for x in self.witnesses[r].values():
+                if x.hash in self.famous:
+                    continue
+                votes = 0  # Bitset of yes votes cast in the previous voting round
+                twin_votes = {}  # Votes cast in the previous voting round by twinned creators, by witness hash
+                exact = self.forkers >> x.creator & 1
+                for j in range(r + 1, max_round + 1):
+                    d = j - r
+                    yes = 0
+                    twin_yes = {}
+                    split_before = twinned[j - 1]
+                    split_here = twinned[j]
+                    for y in self.witnesses.get(j, {}).values():
+                        if d == 1:
+                            # y sees x, inlined as this is the hottest test unless x's creator has a known fork
+                            vote = self.sees(y, x) if exact else y.la[x.creator] >= x.seq
+                        else:
+                            ss = y.ss & ~split_before
+                            yes_count = popcount(ss & votes)
+                            no_count = popcount(ss) - yes_count
+                            if y.ss & split_before:
+                                for w in self.witnesses[j - 1].values():
+                                    if w.hash in twin_votes and y.ss >> w.creator & 1 and self.sees(y, w):
+                                        yes_count += twin_votes[w.hash]
+                                        no_count += not twin_votes[w.hash]
+                            vote = yes_count >= no_count
+                            t = max(yes_count, no_count)
+                            if d % COIN_ROUNDS > 0:
+                                if supermajority(t, n):
+                                    self.famous[x.hash] = vote
+                                    break
+                            elif not supermajority(t, n):
+                                vote = y.middle_bit()
+                        if split_here >> y.creator & 1:
+                            twin_yes[y.hash] = vote
+                        elif vote:
+                            yes |= 1 << y.creator
+                    if x.hash in self.famous:
+                        break
+                    votes = yes
+                    twin_votes = twin_yes
+
+        # Rounds are finished in order; later rounds stay open until every earlier round is decided
+        decided = self.fame_round
+        while self.fame_round < max_round and all(i.hash in self.famous for i in self.witnesses[self.fame_round].values()):
+            if log.isEnabledFor(logging.INFO):
+                log.info("Round %d decided: %d famous witnesses", self.fame_round, sum(self.famous[i.hash] for i in self.witnesses[self.fame_round].values()))
+            self.fame_round += 1
+
+        metrics = self.network.metrics
+        metrics.observe("decide_fame_seconds", time.perf_counter() - start)
+        if self.fame_round > decided:
+            metrics.inc("rounds_decided_total", self.fame_round - decided)
+        return
+
+    def first_seen(self, w, x, heads=None):
+        '''
+        Finds the timestamp of the earliest self-ancestor of witness w that has Event x as an ancestor. Ancestry vectors
+        only grow along a creator's chain, so the search is a binary search. The hg list of a creator with a known fork
+        mixes both sides of it, so the self-ancestors of such a witness are walked instead.
+
+        Args:
+            w (object Event): A famous witness that has x as an ancestor.
+            x (object Event): The Event being timestamped.
+            heads (object ForkHeads): Ancestry tests for x's creator, needed if it has a known fork.
+
+        Returns:
+            (int): Timestamp in nanoseconds.
+
+        '''
+
+        # x is not yet ordered, so no Event that sees it has been pruned
+        if self.forkers >> w.creator & 1:
+            parent = self.events.get(w.sp)
+            while parent is not None and (heads.ancestor(parent, x) if heads else parent.la[x.creator] >= x.seq):
+                w = parent
+                parent = self.events.get(w.sp)
+            return w.timestamp
+        chain = self.hg[w.node_name]
+        base = self.base[w.node_name]
+        low = base
+        high = w.seq
+        while low < high:
+            mid = (low + high) // 2
+            if heads.ancestor(chain[mid - base], x) if heads else chain[mid - base].la[x.creator] >= x.seq:
+                high = mid
+            else:
+                low = mid + 1
+        return chain[low - base].timestamp
+
+    def find_order(self):
+        '''
+        Assigns a round received and consensus timestamp to Events once the fame of a round is decided, and appends them to
+        the consensus order. The round received is the first decided round whose famous witnesses are all descendants of
+        the Event; the timestamp is the median of the times at which those witnesses' creators first received it. An Event
+        (c, s) is an ancestor of every famous witness exactly when s is at most the lowest entry for c in their ancestry
+        vectors, so the Events received in a round are found by walking each creator's chain from its first unordered
+        Event up to that bound. Events of creators with a known fork are tested one by one with ForkHeads, until they
+        are STALE_ROUNDS rounds old.
+
+        '''
+
+        log.debug("Finding order:")
+
+        start = time.perf_counter()
+        ordered = len(self.consensus)
+        names = self.network.names
+        heads = {}  # Creator id -> ForkHeads, for creators with a known fork
+        stale = 0
+        while self.order_round < self.fame_round:
+            r = self.order_round
+            famous = [i for i in self.witnesses.get(r, {}).values() if self.famous[i.hash]]
+            self.order_round += 1
+            if not famous:
+                continue
+
+            whitening = 0  # XOR of the famous witness hashes, used to break timestamp ties
+            for i in famous:
+                whitening ^= int.from_bytes(i.hash, "big")
+
+            received = []
+            for creator, name in enumerate(names):
+                if self.forkers >> creator & 1:
+                    continue
+                # Along a chain the round received never decreases, so the unordered Events are a suffix of it
+                first = self.order_seq[name]
+                bound = min(w.la[creator] for w in famous)
+                if bound < first:
+                    continue
+                base = self.base[name]
+                for x in self.hg[name][first - base:bound + 1 - base]:
+                    times = sorted(self.first_seen(w, x) for w in famous)
+                    received.append((times[len(times) // 2], int.from_bytes(x.hash, "big") ^ whitening, x))
+                self.order_seq[name] = bound + 1
+            remaining = []
+            for x in self.unordered_forked:
+                if x.round < r - STALE_ROUNDS:
+                    stale += 1
+                    continue
+                if x.creator not in heads:
+                    floor = min(i.seq for i in self.unordered_forked if i.creator == x.creator and i.round >= r - STALE_ROUNDS)
+                    heads[x.creator] = ForkHeads(self, x.creator, floor)
+                if all(heads[x.creator].ancestor(w, x) for w in famous):
+                    times = sorted(self.first_seen(w, x, heads[x.creator]) for w in famous)
+                    received.append((times[len(times) // 2], int.from_bytes(x.hash, "big") ^ whitening, x))
+                else:
+                    remaining.append(x)
+            self.unordered_forked = remaining
+
+            received.sort(key=lambda i: (i[0], i[1]))
+            for timestamp, tie, x in received:
+                self.consensus.append((r, timestamp, x))
+            log.info("Round %d received %d events", r, len(received))
+
+        metrics = self.network.metrics
+        metrics.observe("find_order_seconds", time.perf_counter() - start)
+        if stale:
+            metrics.inc("events_stale_total", stale)
+        if len(self.consensus) > ordered:
+            metrics.inc("events_ordered_total", len(self.consensus) - ordered)
+            now = self.network.clock.now_ns()
+            for r, timestamp, x in self.consensus[ordered:]:
+                metrics.observe("consensus_latency_seconds", (now - x.timestamp) / 1e9)
+        return
+
+    def ordered_transactions(self, start=0):
+        '''
+        Returns an iterator over the transactions in consensus order. Like reading a file that is still being written, the
+        iterator stops when it reaches the end of the current order and continues from there when iterated again, so a
+        downstream consumer can keep tailing it.
+
+        Args:
+            start (int): Position in the consensus order of the first Event to read.
+
+        Returns:
+            (object ConsensusStream): Iterator yielding ConsensusTransaction tuples.
+
+        '''
+
+        return ConsensusStream(self, start)
+
+    def ordered_samples(self, start=0):
+        '''
+        Decodes the samples of the Events in consensus order into one NumPy record array.
+
+        Args:
+            start (int): Position in the consensus order of the first Event to read.
+
+        Returns:
+            (numpy.ndarray): The samples, as returned by decode_samples.
+
+        '''
+
+        index = max(start - self.consensus_base, 0)
+        return decode_samples(b"".join(event.data for r, timestamp, event in self.consensus[index:] if event.data))
+
+    def prune(self, keep_rounds, sign=True):
+        '''
+        Drops the Events whose round received is more than keep_rounds decided rounds old and folds them into a signed
+        Snapshot, so a long-running Node holds a bounded part of the hashgraph. Along a creator's chain the round received
+        never decreases, so the dropped Events are a prefix of each hg list and base keeps sequence numbers valid as
+        indexes. A creator's latest Event is always kept so that its next Event still has a self-parent.
+
+        Args:
+            keep_rounds (int): Number of decided rounds of Events to keep, at least 1.
+            sign (bool): Sign the Snapshot; a replayed trace leaves it unsigned.
+
+        Returns:
+            (int): The number of Events dropped.
+
+        '''
+
+        cutoff = self.order_round - keep_rounds  # Events received in earlier rounds are dropped
+        if cutoff - 1 <= self.pruned_round:
+            return 0
+
+        count = 0
+        last = {}  # Creator name -> highest dropped sequence number
+        digest = self.snapshot_digest
+        for r, timestamp, event in self.consensus:
+            if r >= cutoff:
+                break
+            digest = hashlib.blake2b(digest + event.hash, digest_size=HASH_SIZE).digest()
+            last[event.node_name] = max(last.get(event.node_name, -1), event.seq)
+            count += 1
+        del self.consensus[:count]
+        self.consensus_base += count
+
+        dropped = 0
+        cache = self.network.event_cache
+        unordered = set(i.hash for i in self.unordered_forked)
+        for name, seq in last.items():
+            chain = self.hg[name]
+            k = max(min(seq + 1 - self.base[name], len(chain) - 1), 0)  # A kept twin can be ordered below base
+            if unordered:
+                # A forked creator's Events are not ordered along its hg list, so stop at the first unordered one
+                k = next((j for j in range(k) if chain[j].hash in unordered), k)
+            for i in chain[:k]:
+                del self.events[i.hash]
+                self.famous.pop(i.hash, None)
+                if cache is not None:
+                    cache.pop(i.hash, None)
+            del chain[:k]
+            self.base[name] += k
+            dropped += k
+        for r in [i for i in self.witnesses if i < cutoff]:
+            del self.witnesses[r]
+        twins = []
+        for i in self.twins:
+            if i.seq < self.base[i.node_name] and i.hash not in unordered:
+                del self.events[i.hash]
+                self.famous.pop(i.hash, None)
+            else:
+                twins.append(i)
+        self.twins = twins
+        self.fork_slots = set((i.creator, i.seq) for i in twins)
+
+        self.snapshot_digest = digest
+        self.pruned_round = cutoff - 1
+        self.snapshot = self.make_snapshot(sign)
+        return dropped
+
+    def make_snapshot(self, sign=True):
+        '''
+        Signs a Snapshot of the pruned part of the current Node's hashgraph: the digest of the consensus order up to the
+        first Event still held, the last round received that was pruned, and the first sequence number kept per creator.
+
+        Args:
+            sign (bool): Sign the Snapshot; if False its signature is left as None.
+
+        Returns:
+            (Snapshot): The snapshot.
+
+        '''
+
+        frontier = tuple(self.base[i] for i in self.network.names)
+        snapshot = Snapshot(self.id, self.pruned_round, self.consensus_base, self.snapshot_digest, frontier, None)
+        if not sign:
+            return snapshot
+        return snapshot._replace(signature=self.signing_key.sign(encode_snapshot(snapshot)).signature)
+
+    def order_digest(self):
+        '''
+        Digests the whole consensus order held so far, pruned part included. Nodes that have ordered the same number of
+        Events agree on it.
+
+        Returns:
+            (bytes): The digest.
+
+        '''
+
+        digest = self.snapshot_digest
+        for r, timestamp, event in self.consensus:
+            digest = hashlib.blake2b(digest + event.hash, digest_size=HASH_SIZE).digest()
+        return digest
+
+    def needs_bootstrap(self, peer):
+        '''
+        Checks whether the current Node has fallen so far behind a peer that Events it is missing were already pruned
+        there. It then has to bootstrap from the peer's Snapshot, which is only done when the Events the current Node
+        created and the peer lacks (such as a new Node's init Event) can be carried over on top of the peer's state, so
+        that the Node's own chain carries on without a fork.
+
+        Args:
+            peer (object Node): The Node that would send the missing Events.
+
+        Returns:
+            (bool): True if the current Node should bootstrap from peer.
+
+        '''
+
+        if peer.snapshot is None or self.log is not None:  # A bootstrapped Node's log could no longer be replayed
+            return False
+        known = self.known_counts()
+        if not any(count < peer.base[name] for count, name in zip(known, self.network.names)):
+            return False
+        return self.unsent_events(peer) is not None
+
+    def unsent_events(self, peer):
+        '''
+        Lists the Events the current Node created that a peer does not hold, provided every parent of each is held by the
+        peer or is one of them, so they can be inserted on top of the peer's hashgraph.
+
+        Args:
+            peer (object Node): The Node whose hashgraph the Events would be placed on.
+
+        Returns:
+            (List): The Events in creation order, or None if they cannot all be placed.
+
+        '''
+
+        start = peer.base[self.name] + len(peer.hg[self.name])  # First sequence number the peer does not hold
+        if start < self.base[self.name]:
+            return None
+        unsent = self.hg[self.name][start - self.base[self.name]:]
+        placed = set()
+        for i in unsent:
+            for parent in (i.sp, i.op):
+                if parent is not None and parent not in peer.events and parent not in placed:
+                    return None
+            placed.add(i.hash)
+        return unsent
+
+    def bootstrap(self, peer, trusted=False):
+        '''
+        Replaces the current Node's hashgraph with a peer's pruned state: the peer's signed Snapshot in place of the
+        pruned Events, and the Events the peer still holds. The Snapshot and every Event are verified against the key
+        registry. Round, witness and ancestry data depend only on an Event's ancestors and are taken from the peer
+        along with the Events, as are the fame decisions and consensus order after the Snapshot. Events the current Node
+        created that the peer lacks are then inserted again on top, to be gossiped from there.
+
+        Args:
+            peer (object Node): The Node to bootstrap from.
+            trusted (bool): Skip verifying the Snapshot and Events, for a replayed trace whose Events were verified when
+                it was recorded.
+
+        Raises:
+            ValueError: If the peer has no Snapshot, it or any Event fails verification, or the current Node's own Events
+                cannot be carried over.
+
+        '''
+
+        snapshot = peer.snapshot
+        if snapshot is None:
+            raise ValueError("Node {} has no snapshot to bootstrap from".format(peer.name))
+        unsent = self.unsent_events(peer)
+        if unsent is None:
+            raise ValueError("Node {} cannot carry its own events over to the state of Node {}".format(self.name, peer.name))
+        if self.network.trace is not None:
+            self.network.trace.bootstrap(self.network.clock.now_ns(), peer.id, self.id)
+        held = list(peer.events.values())
+        events = decode_sync(encode_sync(held), self.network.names)
+        if not trusted:
+            verify_key = self.network.verify_keys.get(snapshot.creator)
+            if verify_key is None or not crypto.verify(verify_key, encode_snapshot(snapshot), snapshot.signature):
+                raise ValueError("Snapshot from Node {} has a bad signature".format(peer.name))
+            if not all(self.network.verify_events(events)):
+                raise ValueError("Node {} sent an Event with a bad signature".format(peer.name))
+
+        self.base = dict(zip(self.network.names, snapshot.frontier))
+        self.hg = {i: [] for i in self.network.names}
+        self.events = {}
+        self.twins = []
+        self.fork_slots = set()
+        self.witnesses = {}
+        self.famous = {}
+        for event, source in zip(events, held):
+            event.verified = True
+            event.la = array.array("i", source.la)
+            event.height = source.height
+            event.round = source.round
+            event.witness = source.witness
+            event.ss = source.ss
+            event.fk = source.fk
+            event.tips = source.tips
+            if event.seq - self.base[event.node_name] < len(self.hg[event.node_name]):
+                self.twins.append(event)  # Events reach hg in insertion order, so the twin always comes second
+                self.fork_slots.add((event.creator, event.seq))
+            else:
+                self.hg[event.node_name].append(event)
+            self.events[event.hash] = event
+            if event.witness and event.round > snapshot.last_round:
+                self.witnesses.setdefault(event.round, {})[event.hash] = event
+            if event.hash in peer.famous:
+                self.famous[event.hash] = peer.famous[event.hash]
+
+        self.forks = dict(peer.forks)
+        self.forkers = peer.forkers
+        self.fame_round = peer.fame_round
+        self.order_round = peer.order_round
+        self.new_events = []
+        self.order_seq = dict(peer.order_seq)
+        self.unordered_forked = [self.events[i.hash] for i in peer.unordered_forked] if self.observer else []
+        self.consensus = [(r, timestamp, self.events[i.hash]) for r, timestamp, i in peer.consensus]
+        self.consensus_base = snapshot.position
+        self.pruned_round = snapshot.last_round
+        self.snapshot_digest = snapshot.digest
+        self.snapshot = snapshot
+        for i in unsent:
+            self.insert_event(i)
+        return
+
+    def main(self, steps=None, interval=1.0):
+        '''
+        Runs the Node: each step starts a sync with a random Node and waits for one from another Node.
+
+        Args:
+            steps (int): Number of steps to run, forever if None.
+            interval (float): Seconds to wait for an inbound sync in each step.
+
+        '''
+
+        # Only gossip runs here; divide_rounds, decide_fame and find_order run in Transport.serve after each inbound sync
+        step = 0
+        while steps is None or step < steps:
+            if not SIM:
+
+                # IMPORTANT: The following code will only be used in the actual implementation, not the simulation.
+                # Drawn from the Node's own stream: every process seeds the Network's rng the same way
+                rand_node_idx = self.rng.randrange(len(self.network.names))
+
+                while(self.id == rand_node_idx):
+                    rand_node_idx = self.rng.randrange(len(self.network.names))
+
+                # Pick random node != current node
+                #while(current_node == (rand_node_idx := random.randrange(N))):
+                #rand_node_idx = random.randrange(N)
+
+
+                rand_node = self.network.names[rand_node_idx]
+                t1 = threading.Thread(target=self.begin_sync, args=(rand_node,))
+                t2 = threading.Thread(target=self.wait_sync, args=(interval,))
+
+                # Begin sync and wait sync
+                t1.start()
+                t2.start()
+
+                # Wait for sync to complete
+                t1.join()
+                t2.join()
+
+            #print("\n______________________\n\n______________________\n")
+            step += 1
+        return
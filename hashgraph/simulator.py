@@ -0,0 +1,456 @@
+"""
+Headless and discrete-event drivers for simulated Networks.
+"""
+
+import heapq
+import time
+import tracemalloc
+
+from .event import Event, decode_event, encode_sync, pack_transactions
+from .network import Network
+from .storage import TRACE_BOOTSTRAP, TRACE_CREATE, TRACE_SYNC, read_trace
+
+
+class LinkModel:
+    """
+    Latency and loss of the simulated links between Nodes.
+
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, loss=0.0):
+        '''
+        Args:
+            latency (float): Fixed delivery delay of a sync, in seconds.
+            jitter (float): Extra delay drawn uniformly from [0, jitter] seconds.
+            loss (float): Probability that a sync is lost.
+
+        '''
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+
+    def delay(self, rng):
+        '''
+        Draws the delivery delay of one sync.
+
+        Args:
+            rng (random.Random): Source of randomness for the draw.
+
+        Returns:
+            (float): Delay in seconds, or None if the sync is lost.
+
+        '''
+
+        if self.loss and rng.random() < self.loss:
+            return None
+        return self.latency + rng.uniform(0, self.jitter)
+
+
+class Simulator:
+    """
+    Discrete-event driver for a headless Network. Gossip is a priority queue of timed actions on the virtual clock
+    rather than a thread per Node, so hundreds of Nodes can run in one process.
+
+    """
+
+    def __init__(self, nw, link=None, sync_interval=1.0, observers=None):
+        '''
+        Args:
+            nw (object Network): Headless simulated Network with its Nodes initialized.
+            link (object LinkModel): Latency and loss of every link.
+            sync_interval (float): Mean time in seconds between syncs started by each Node.
+            observers (int): Number of Nodes that run consensus, all of them if None. The rest only gossip.
+
+        '''
+        self.network = nw
+        self.link = link or LinkModel()
+        self.sync_interval = sync_interval
+        self.queue = []  # Heap of (time ns, counter, action, args)
+        self.counter = 0  # Orders actions scheduled for the same time
+        self.syncs = 0
+        self.lost = 0
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.latencies = []  # Seconds from Event creation to consensus order, measured on observers
+
+        # Simulated Nodes share decoded Events; everything stored on an Event depends only on its ancestry
+        nw.event_cache = {}
+        for i in nw.nodes:
+            nw.event_cache.update(i.events)
+        if observers is not None:
+            for i in nw.nodes[observers:]:
+                i.observer = False
+                i.new_events = []
+                i.unordered_forked = []
+
+        for i in nw.nodes:
+            self.schedule(nw.rng.expovariate(1.0 / sync_interval), self.gossip, i)
+
+    def schedule(self, delay, action, *args):
+        '''
+        Queues an action to run after a delay on the virtual clock.
+
+        Args:
+            delay (float): Seconds from now.
+            action (function): Called with args when its time comes.
+
+        '''
+
+        at = self.network.clock.now_ns() + int(delay * 1000000000)
+        heapq.heappush(self.queue, (at, self.counter, action, args))
+        self.counter += 1
+        return
+
+    def gossip(self, node):
+        '''
+        Starts a sync from a Node to a random partner and schedules the Node's next sync.
+
+        Args:
+            node (object Node): The Node starting the sync.
+
+        '''
+
+        rng = self.network.rng
+        partner = node
+        while partner is node:
+            partner = rng.choice(self.network.nodes)
+
+        if partner.needs_bootstrap(node):
+            partner.bootstrap(node)
+        missing = node.events_since(partner.known_counts(), partner, partner.fork_slots)
+        packet = encode_sync(missing)
+        node.record_sync(partner.name, missing, packet)
+        self.syncs += 1
+        self.events_sent += len(missing)
+        self.bytes_sent += len(packet)
+
+        delay = self.link.delay(rng)
+        if delay is None:
+            self.lost += 1
+        else:
+            self.schedule(delay, self.deliver, node, partner, packet)
+        self.schedule(rng.expovariate(1.0 / self.sync_interval), self.gossip, node)
+        return
+
+    def deliver(self, sender, receiver, packet):
+        '''
+        Delivers a sync packet and, on observers, runs consensus and records how long newly ordered Events took.
+
+        Args:
+            sender (object Node): The Node that sent the packet.
+            receiver (object Node): The Node receiving it.
+            packet (bytes): Sync packet built by encode_sync.
+
+        '''
+
+        receiver.receive_sync(sender, packet)
+        if receiver.observer:
+            ordered = len(receiver.consensus)
+            receiver.divide_rounds()
+            receiver.decide_fame()
+            receiver.find_order()
+            now = self.network.clock.now_ns()
+            for r, timestamp, event in receiver.consensus[ordered:]:
+                self.latencies.append((now - event.timestamp) / 1e9)
+            if self.network.keep_rounds:
+                receiver.prune(self.network.keep_rounds)
+        return
+
+    def run(self, duration):
+        '''
+        Runs every queued action due within the given simulated time.
+
+        Args:
+            duration (float): Simulated seconds to run for.
+
+        Returns:
+            (dict): Summary of the run so far.
+
+        '''
+
+        start = time.perf_counter()
+        clock = self.network.clock
+        end = clock.now_ns() + int(duration * 1000000000)
+        while self.queue and self.queue[0][0] <= end:
+            at, counter, action, args = heapq.heappop(self.queue)
+            clock.time_ns = at
+            action(*args)
+        clock.time_ns = end
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, seconds):
+        '''
+        Summarizes the gossip and consensus measured so far.
+
+        Args:
+            seconds (float): Wall-clock time spent running.
+
+        Returns:
+            (dict): Summary of the run.
+
+        '''
+
+        observers = [i for i in self.network.nodes if i.observer]
+        latencies = sorted(self.latencies)
+        return {
+            "nodes": len(self.network.nodes),
+            "observers": len(observers),
+            "simulated_seconds": self.network.clock.now_ns() / 1e9,
+            "seconds": seconds,
+            "syncs": self.syncs,
+            "lost": self.lost,
+            "events": max(sum(i.known_counts()) for i in self.network.nodes),
+            "events_held": max(len(i.events) for i in self.network.nodes),
+            "events_sent": self.events_sent,
+            "bytes_sent": self.bytes_sent,
+            "rounds_decided": min(i.fame_round for i in observers) - 1 if observers else 0,
+            "forks_detected": sum(len(i.forks) for i in self.network.nodes),
+            "orders_agree": orders_agree(self.network.nodes),
+            "order_digests": order_digests(self.network.nodes),
+            "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        }
+
+
+def run_headless(nw, steps):
+    '''
+    Runs a fixed number of gossip syncs from a single thread with no output or pauses, running consensus on every Node
+    after each sync. Time comes from the Network's virtual clock, which advances by an exponential gap of mean one second
+    before each sync, so a seeded run always produces the same hashgraph and its timestamps and latencies mean something.
+
+    Args:
+        nw (object Network): Headless simulated Network.
+        steps (int): Number of syncs to run.
+
+    Returns:
+        (dict): Summary of the run.
+
+    '''
+
+    start = time.perf_counter()
+    events_sent = 0
+    bytes_sent = 0
+    for step in range(steps):
+        nw.clock.sleep(nw.rng.expovariate(1.0))  # Node.sync never sleeps, so the run moves the clock itself
+        sender, receiver = nw.rng.sample(nw.nodes, 2)
+        report = sender.sync(receiver)
+        events_sent += report.events_sent
+        bytes_sent += report.bytes_sent
+
+        for i in nw.nodes:
+            i.divide_rounds()
+            i.decide_fame()
+            i.find_order()
+            if nw.keep_rounds:
+                i.prune(nw.keep_rounds)
+    elapsed = time.perf_counter() - start
+
+    return {
+            "nodes": len(nw.nodes),
+            "syncs": steps,
+            "seconds": elapsed,
+            "syncs_per_second": steps / elapsed if elapsed else 0.0,
+            "events": sum(sum(i.known_counts()) for i in nw.nodes) // len(nw.nodes),
+            "events_held": max(len(i.events) for i in nw.nodes),
+            "events_sent": events_sent,
+            "bytes_sent": bytes_sent,
+            "rounds_decided": min(i.fame_round for i in nw.nodes) - 1,
+            "events_ordered": min(i.consensus_base + len(i.consensus) for i in nw.nodes),
+            "forks_detected": sum(len(i.forks) for i in nw.nodes),
+            "orders_agree": orders_agree(nw.nodes),
+            "order_digests": order_digests(nw.nodes),
+    }
+
+
+def orders_agree(nodes):
+    '''
+    Checks that the honest Nodes agree on the consensus order: at every position that all of them still hold, each has
+    the same Event. Byzantine Nodes and Nodes that do not run consensus are left out.
+
+    Args:
+        nodes (List): The Nodes of a run.
+
+    Returns:
+        (bool): True if no two of the Nodes ordered different Events at the same position.
+
+    '''
+
+    honest = [i for i in nodes if i.observer and not i.byzantine]
+    if not honest:
+        return True
+    start = max(i.consensus_base for i in honest)
+    end = min(i.consensus_base + len(i.consensus) for i in honest)
+    orders = set()
+    for i in honest:
+        orders.add(tuple(event.hash for r, timestamp, event in i.consensus[start - i.consensus_base:end - i.consensus_base]))
+    return len(orders) <= 1
+
+
+def order_digests(nodes):
+    '''
+    Lists the order_digest of every Node that runs consensus, so that a replay can be checked against the recorded run
+    from the two summaries alone.
+
+    Args:
+        nodes (List): The Nodes of a run.
+
+    Returns:
+        (String): Comma-separated name:digest pairs, each digest cut to its first 16 hex digits.
+
+    '''
+
+    return ",".join("{}:{}".format(i.name, i.order_digest().hex()[:16]) for i in nodes if i.observer)
+
+
+def replay_trace(path):
+    '''
+    Replays a recorded gossip trace at full speed: each recorded sync inserts the same Events into the same receiving
+    Node, followed by the Event the receiver created, and then runs consensus on the receiver, as the headless and
+    discrete-event drivers do. Nothing is signed, verified, sent or slept on, so every Node ends with the recorded
+    hashgraph, rounds and consensus order, and the consensus stages see the same workload on every replay. The
+    summary's order_digests match those of the recorded run.
+
+    Args:
+        path (String): Trace written by GossipTrace.
+
+    Returns:
+        (dict): Summary of the replay, with the time spent in each stage.
+
+    '''
+
+    names, keep_rounds, records = read_trace(path)
+    nw = Network(headless=True, seed=0)  # Keys are never used: Snapshots stay unsigned and bootstraps are trusted
+    nw.keep_rounds = keep_rounds
+    nw.init_nodes(names)
+    nw.node_set_network(nw, init_events=False)
+
+    def decode(signature, body):
+        event = decode_event(body, names)
+        event.signature = signature
+        event.verified = True  # Signatures were checked when the trace was recorded
+        return event
+
+    stages = dict.fromkeys(("insert_event", "divide_rounds", "decide_fame", "find_order", "prune"), 0.0)
+
+    def timed(stage, action, *args):
+        start = time.perf_counter()
+        result = action(*args)
+        stages[stage] += time.perf_counter() - start
+        return result
+
+    def consensus(node):
+        timed("divide_rounds", node.divide_rounds)
+        timed("decide_fame", node.decide_fame)
+        timed("find_order", node.find_order)
+        if keep_rounds:
+            timed("prune", node.prune, keep_rounds, False)
+
+    start = time.perf_counter()
+    pool = []  # (signature, encoding) of every Event in the trace, by index
+    pending = None  # Receiver of the last sync, whose consensus runs once its new Event is in
+    syncs = 0
+    for record in records:
+        nw.clock.time_ns = record.time
+        if record.kind == TRACE_SYNC or record.kind == TRACE_BOOTSTRAP:
+            if pending is not None:
+                consensus(pending)
+                pending = None
+        if record.kind == TRACE_SYNC:
+            receiver = nw.nodes[record.second]
+            for i in record.events:
+                try:
+                    timed("insert_event", receiver.insert_event, decode(*pool[i]))
+                except ValueError:
+                    receiver.rejected += 1
+            pending = receiver
+            syncs += 1
+        elif record.kind == TRACE_BOOTSTRAP:
+            nw.nodes[record.second].bootstrap(nw.nodes[record.first], trusted=True)
+        else:
+            pool.append(record.events)
+            if record.kind == TRACE_CREATE:
+                timed("insert_event", nw.nodes[record.first].insert_event, decode(*record.events))
+    if pending is not None:
+        consensus(pending)
+    elapsed = time.perf_counter() - start
+
+    summary = {
+            "nodes": len(nw.nodes),
+            "syncs": syncs,
+            "events": len(pool),
+            "seconds": elapsed,
+            "syncs_per_second": syncs / elapsed if elapsed else 0.0,
+            "rounds_decided": min(i.fame_round for i in nw.nodes) - 1,
+            "events_ordered": min(i.consensus_base + len(i.consensus) for i in nw.nodes),
+            "forks_detected": sum(len(i.forks) for i in nw.nodes),
+            "order_digests": order_digests(nw.nodes),
+    }
+    for stage, seconds in stages.items():
+        summary[stage + "_seconds"] = seconds
+    nw.shutdown()
+    return summary
+
+
+def grow_history(nw, node, count):
+    '''
+    Inserts count Events into a Node's hashgraph, with every Node taking turns as creator and a random other Node as
+    other-parent. Events get a placeholder signature instead of being signed, so large histories build quickly.
+
+    Args:
+        nw (object Network): Headless simulated Network.
+        node (object Node): The Node whose hashgraph grows.
+        count (int): Number of Events to insert.
+
+    '''
+
+    for i in nw.nodes:
+        if i is not node:
+            node.insert_event(i.hg[i.name][0])  # Every creator starts from its own init Event
+    n = len(nw.names)
+    for k in range(count):
+        creator = k % n
+        other = nw.rng.randrange(n - 1)
+        other += other >= creator
+        self_parent = node.hg[nw.names[creator]][-1]
+        other_parent = node.hg[nw.names[other]][-1]
+        seq = self_parent.seq + 1
+        event = Event(nw.clock.now_ns(), pack_transactions([node.generate_random_data()]), self_parent.hash, other_parent.hash, nw.names[creator], creator, seq)
+        event.signature = bytes(64)
+        event.verified = True
+        node.insert_event(event)
+        nw.clock.sleep(0.001)
+
+
+def run_memory_bench(nw, count):
+    '''
+    Measures the memory held per Event by inserting count Events into the first Node's hashgraph, with every Node taking
+    turns as creator and a random other Node as other-parent. Events get a placeholder signature instead of being signed
+    and no consensus is run, so the figure covers the Events, hg and the hash index only.
+
+    Args:
+        nw (object Network): Headless simulated Network.
+        count (int): Number of Events to insert.
+
+    Returns:
+        (dict): Summary of the run.
+
+    '''
+
+    node = nw.nodes[0]
+    node.observer = False
+    start = time.perf_counter()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    grow_history(nw, node, count)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+
+    return {
+            "nodes": len(nw.names),
+            "events": count,
+            "seconds": elapsed,
+            "bytes": used,
+            "bytes_per_event": used / count if count else 0.0,
+    }
@@ -0,0 +1,323 @@
+"""
+Append-only per-Node event log, the signed snapshot that replaces pruned rounds, and gossip traces.
+"""
+
+import collections
+import mmap
+import os
+import struct
+import zlib
+
+
+# On-disk log record layout: encoding length, CRC32 of signature + encoding, detached signature. The encoding follows.
+LOG_FRAME = struct.Struct("<II64s")
+SEGMENT_BYTES = 64 * 1024 * 1024  # A new log segment is started once the current one would grow past this
+FSYNC_EVERY = 64  # Appended records per fsync batch
+
+# Snapshot layout: creator id, last pruned round received, consensus position, ordered-event digest. The per-creator
+# sequence frontier follows as one uint32 per creator.
+SNAPSHOT_HEADER = struct.Struct("<HIQ32s")
+
+# Signed summary of the pruned part of a Node's hashgraph
+Snapshot = collections.namedtuple("Snapshot", ["creator", "last_round", "position", "digest", "frontier", "signature"])
+
+# Gossip trace layout: magic, Node count, keep_rounds (0 keeps everything). Each Node name follows as a uint16 length
+# and UTF-8 bytes, then the records.
+TRACE_MAGIC = b"HGT1"
+TRACE_HEADER = struct.Struct("<4sHI")
+# Trace record: kind, virtual clock time, two Node ids and a count. An Event record is followed by the signature and
+# the canonical encoding (count is its length); a sync record by count uint32 indexes of Events in the trace.
+TRACE_RECORD = struct.Struct("<BqHHI")
+TRACE_CREATE = 1  # A Node created and inserted an Event: creator, unused
+TRACE_EVENT = 2  # An Event was first sent without its creator inserting it, e.g. a forged twin: creator, unused
+TRACE_SYNC = 3  # A Node received a sync packet: sender, receiver
+TRACE_BOOTSTRAP = 4  # A Node bootstrapped from a peer's Snapshot: peer, receiver
+
+# One decoded trace record. Event records carry (signature, encoding) in events; sync records carry trace indexes.
+TraceRecord = collections.namedtuple("TraceRecord", ["kind", "time", "first", "second", "events"])
+
+
+def encode_snapshot(snapshot):
+    '''
+    Packs the signed fields of a Snapshot into its canonical encoding.
+
+    Args:
+        snapshot (Snapshot): The snapshot to encode; its signature is not part of the encoding.
+
+    Returns:
+        (bytes): The canonical encoding.
+
+    '''
+
+    header = SNAPSHOT_HEADER.pack(snapshot.creator, snapshot.last_round, snapshot.position, snapshot.digest)
+    return header + struct.pack("<{}I".format(len(snapshot.frontier)), *snapshot.frontier)
+
+
+class EventLog:
+    """
+    Append-only, segmented on-disk log of the signed Events a Node has inserted, in insertion (topological) order.
+    Records are fsynced in batches. A small index file records how much of each segment is known to be durable.
+
+    """
+
+    def __init__(self, path, fsync_every=FSYNC_EVERY, segment_bytes=SEGMENT_BYTES):
+        '''
+        Args:
+            path (String): Directory holding the segments and the index; created if missing.
+            fsync_every (int): Number of appended records per fsync.
+            segment_bytes (int): Size at which a new segment is started.
+
+        '''
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fsync_every = fsync_every
+        self.segment_bytes = segment_bytes
+        self.durable = {}  # Segment number -> bytes known to be fsynced
+        self.pending = 0  # Records appended since the last fsync
+        self.file = None
+        self.segment = 0
+        self.size = 0
+
+        if os.path.exists(self.index_path()):
+            with open(self.index_path()) as f:
+                for line in f:
+                    number, durable = line.split()
+                    self.durable[int(number)] = int(durable)
+
+    def index_path(self):
+        return os.path.join(self.path, "index")
+
+    def segment_path(self, number):
+        return os.path.join(self.path, "{:06d}.seg".format(number))
+
+    def segment_numbers(self):
+        '''
+        Lists the segments on disk.
+
+        Returns:
+            (List): Segment numbers in ascending order.
+
+        '''
+
+        return sorted(int(i[:-4]) for i in os.listdir(self.path) if i.endswith(".seg"))
+
+    def replay(self):
+        '''
+        Reads back every intact record, memory-mapping one segment at a time. Records inside the durable part of a
+        segment are trusted; anything after it is checked against its CRC, and a torn tail left by a crash is cut off
+        once the generator is exhausted. Appending continues after the last intact record.
+
+        Returns:
+            (generator): Yields (signature, canonical encoding) for each record.
+
+        '''
+
+        for number in self.segment_numbers():
+            path = self.segment_path(number)
+            size = os.path.getsize(path)
+            durable = self.durable.get(number, 0)
+            offset = 0
+            if size:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    while offset + LOG_FRAME.size <= size:
+                        length, crc, signature = LOG_FRAME.unpack_from(view, offset)
+                        end = offset + LOG_FRAME.size + length
+                        if end > size:
+                            break
+                        body = view[offset + LOG_FRAME.size:end]
+                        if end > durable and zlib.crc32(body, zlib.crc32(signature)) != crc:
+                            break
+                        yield signature, body
+                        offset = end
+            if offset < size:
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+            self.segment = number
+            self.size = offset
+        return
+
+    def append(self, event):
+        '''
+        Appends a signed Event, starting a new segment or fsyncing the batch when needed.
+
+        Args:
+            event (object Event): The Event to log.
+
+        '''
+
+        body = event.encode()
+        record = LOG_FRAME.pack(len(body), zlib.crc32(body, zlib.crc32(event.signature)), event.signature) + body
+        if self.file is not None and self.size + len(record) > self.segment_bytes:
+            self.sync()
+            self.file.close()
+            self.file = None
+            self.segment += 1
+            self.size = 0
+        if self.file is None:
+            self.file = open(self.segment_path(self.segment), "ab")
+
+        self.file.write(record)
+        self.size += len(record)
+        self.pending += 1
+        if self.pending >= self.fsync_every:
+            self.sync()
+        return
+
+    def sync(self):
+        '''
+        Flushes and fsyncs appended records, then records the durable size of the segment in the index.
+
+        '''
+
+        if self.file is None:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.durable[self.segment] = self.size
+
+        temp = self.index_path() + ".tmp"
+        with open(temp, "w") as f:
+            for number in sorted(self.durable):
+                f.write("{} {}\n".format(number, self.durable[number]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.index_path())
+        return
+
+    def close(self):
+        '''
+        Makes every appended record durable and closes the current segment.
+
+        '''
+
+        self.sync()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        return
+
+
+class GossipTrace:
+    """
+    Compact record of a simulated run's gossip: every Event once, in the order it appeared, then each sync as the sender,
+    the receiver and the indexes of the Events in the packet. Replaying the records rebuilds every Node's hashgraph
+    without the network, the clock's sleeps, signing or verification.
+
+    """
+
+    def __init__(self, path, names, keep_rounds=None):
+        '''
+        Args:
+            path (String): File the trace is written to; an existing file is replaced.
+            names (List): Node names indexed by creator id.
+            keep_rounds (int): Decided rounds of Events each Node keeps, None keeps everything.
+
+        '''
+        self.file = open(path, "wb")
+        self.index = {}  # Event hash -> position of its record among the trace's Events
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, len(names), keep_rounds or 0))
+        for i in names:
+            name = i.encode()
+            self.file.write(struct.pack("<H", len(name)) + name)
+
+    def event(self, event, time_ns, kind=TRACE_EVENT):
+        '''
+        Records an Event the first time it is seen.
+
+        Args:
+            event (object Event): The Event.
+            time_ns (int): Virtual clock time.
+            kind (int): TRACE_CREATE if the Event's creator has just inserted it, otherwise TRACE_EVENT.
+
+        Returns:
+            (int): The Event's index in the trace.
+
+        '''
+
+        position = self.index.get(event.hash)
+        if position is None:
+            body = event.encode()
+            self.file.write(TRACE_RECORD.pack(kind, time_ns, event.creator, 0, len(body)) + event.signature + body)
+            position = self.index[event.hash] = len(self.index)
+        return position
+
+    def sync(self, time_ns, sender, receiver, events):
+        '''
+        Records a sync packet as it is received. Events not in the trace yet are recorded first.
+
+        Args:
+            time_ns (int): Virtual clock time.
+            sender (int): Creator id of the sending Node.
+            receiver (int): Creator id of the receiving Node.
+            events (List): The Events in the packet, in the order they were sent.
+
+        '''
+
+        indexes = [self.event(i, time_ns) for i in events]
+        self.file.write(TRACE_RECORD.pack(TRACE_SYNC, time_ns, sender, receiver, len(indexes)))
+        self.file.write(struct.pack("<{}I".format(len(indexes)), *indexes))
+        return
+
+    def bootstrap(self, time_ns, peer, receiver):
+        '''
+        Records that a Node replaced its hashgraph with a peer's pruned state.
+
+        Args:
+            time_ns (int): Virtual clock time.
+            peer (int): Creator id of the Node bootstrapped from.
+            receiver (int): Creator id of the bootstrapping Node.
+
+        '''
+
+        self.file.write(TRACE_RECORD.pack(TRACE_BOOTSTRAP, time_ns, peer, receiver, 0))
+        return
+
+    def close(self):
+        self.file.close()
+        return
+
+
+def read_trace(path):
+    '''
+    Reads a trace written by GossipTrace.
+
+    Args:
+        path (String): The trace file.
+
+    Returns:
+        (tuple): The Node names, keep_rounds (None keeps everything) and a generator of TraceRecords.
+
+    Raises:
+        ValueError: If the file is not a gossip trace.
+
+    '''
+
+    with open(path, "rb") as f:
+        buf = f.read()
+    magic, n, keep_rounds = TRACE_HEADER.unpack_from(buf)
+    if magic != TRACE_MAGIC:
+        raise ValueError("{} is not a gossip trace".format(path))
+    offset = TRACE_HEADER.size
+    names = []
+    for i in range(n):
+        size, = struct.unpack_from("<H", buf, offset)
+        names.append(buf[offset + 2:offset + 2 + size].decode())
+        offset += 2 + size
+
+    def records(offset):
+        view = memoryview(buf)
+        while offset < len(buf):
+            kind, time_ns, first, second, count = TRACE_RECORD.unpack_from(view, offset)
+            offset += TRACE_RECORD.size
+            if kind == TRACE_SYNC:
+                events = struct.unpack_from("<{}I".format(count), view, offset)
+                offset += 4 * count
+            elif kind == TRACE_BOOTSTRAP:
+                events = ()
+            else:
+                events = (bytes(view[offset:offset + 64]), bytes(view[offset + 64:offset + 64 + count]))
+                offset += 64 + count
+            yield TraceRecord(kind, time_ns, first, second, events)
+
+    return names, keep_rounds or None, records(offset)
@@ -0,0 +1,121 @@
+"""
+Parameter sweeps: many independent discrete-event simulations run in parallel, one row of results per run.
+"""
+
+import concurrent.futures
+import csv
+import itertools
+import logging
+import time
+
+from . import node
+from .network import Network
+from .simulator import LinkModel, Simulator
+
+
+SWEEP_NODES = (4, 7, 10)  # Default Node counts of a --sweep run
+SWEEP_INTERVALS = (0.5, 1.0)  # Default mean seconds between syncs started by each Node
+SWEEP_BYZANTINE = (0.0, 0.2)  # Default fractions of Nodes that fork their Events
+SWEEP_SEEDS = (0, 1, 2)  # Default seeds; each is a separate run of every other combination
+
+# Columns of the results file, in order: the run's parameters first, then what it measured
+SWEEP_COLUMNS = ["nodes", "interval", "byzantine", "seed", "duration", "syncs", "events", "bytes_sent", "forks_detected",
+                 "orders_agree", "rounds_decided", "events_ordered", "latency_mean", "latency_p50", "latency_p95", "seconds",
+                 "events_per_second"]
+
+
+def sweep_grid(nodes=SWEEP_NODES, intervals=SWEEP_INTERVALS, byzantine=SWEEP_BYZANTINE, seeds=SWEEP_SEEDS):
+    '''
+    Lists every combination of the swept parameters.
+
+    Args:
+        nodes (List): Node counts.
+        intervals (List): Mean seconds between syncs started by each Node.
+        byzantine (List): Fractions of the Nodes that fork their Events, rounded down to whole Nodes.
+        seeds (List): Seeds for keys, gossip and samples.
+
+    Returns:
+        (List): One dict of parameters per run.
+
+    '''
+
+    return [{"nodes": n, "interval": interval, "byzantine": fraction, "seed": seed}
+            for n, interval, fraction, seed in itertools.product(nodes, intervals, byzantine, seeds)]
+
+
+def run_sweep_case(params, duration, link=None, keep_rounds=None):
+    '''
+    Runs one discrete-event simulation of the sweep. Called in a worker process, so it builds its own Network.
+
+    Args:
+        params (dict): One entry of sweep_grid.
+        duration (float): Simulated seconds to run for.
+        link (object LinkModel): Latency and loss of every link.
+        keep_rounds (int): Decided rounds of Events each Node keeps, None keeps everything.
+
+    Returns:
+        (dict): The parameters and the measured results, keyed by the names in SWEEP_COLUMNS.
+
+    '''
+
+    nw = Network(headless=True, seed=params["seed"])
+    nw.keep_rounds = keep_rounds
+    nw.init_nodes(["N{}".format(i) for i in range(params["nodes"])])
+    nw.node_set_network(nw)
+    for i in nw.nodes[:int(params["byzantine"] * params["nodes"])]:
+        i.byzantine = True
+    simulator = Simulator(nw, link, params["interval"])
+
+    # Forks are counted in the row; a warning from every Node of every run would only bury the progress lines
+    node_log = logging.getLogger(node.__name__)
+    level = node_log.level
+    node_log.setLevel(logging.ERROR)
+    try:
+        summary = simulator.run(duration)
+    finally:
+        node_log.setLevel(level)
+        nw.shutdown()
+    ordered = min(i.consensus_base + len(i.consensus) for i in nw.nodes)
+
+    row = dict(params, duration=duration, events_ordered=ordered)
+    row.update((k, summary[k]) for k in SWEEP_COLUMNS if k in summary and k not in row)
+    row["events_per_second"] = ordered / summary["seconds"] if summary["seconds"] else 0.0
+    return row
+
+
+def run_sweep(path, grid, duration=60.0, link=None, keep_rounds=None, workers=None):
+    '''
+    Runs run_sweep_case for every entry of the grid across a pool of processes, and appends each run's row to a CSV file
+    as soon as the run finishes, so a long sweep can be watched and keeps its finished runs if it is stopped. Rows are
+    in completion order; the parameter columns identify each run.
+
+    Args:
+        path (String): CSV file the results are written to.
+        grid (List): Parameters of each run, as returned by sweep_grid.
+        duration (float): Simulated seconds of each run.
+        link (object LinkModel): Latency and loss of every link.
+        keep_rounds (int): Decided rounds of Events each Node keeps, None keeps everything.
+        workers (int): Number of worker processes, None for one per CPU.
+
+    Returns:
+        (int): The number of rows written.
+
+    '''
+
+    link = link or LinkModel()
+    start = time.perf_counter()
+    rows = 0
+    with open(path, "w", newline="") as f, concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        writer = csv.DictWriter(f, SWEEP_COLUMNS)
+        writer.writeheader()
+        f.flush()
+        jobs = [executor.submit(run_sweep_case, params, duration, link, keep_rounds) for params in grid]
+        for job in concurrent.futures.as_completed(jobs):
+            row = job.result()
+            writer.writerow(row)
+            f.flush()
+            rows += 1
+            print("{}/{} nodes={} interval={} byzantine={} seed={} rounds_decided={} events_per_second={:.0f} ({:.0f}s)".format(
+                rows, len(grid), row["nodes"], row["interval"], row["byzantine"], row["seed"], row["rounds_decided"],
+                row["events_per_second"], time.perf_counter() - start))
+    return rows
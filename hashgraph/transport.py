@@ -0,0 +1,264 @@
+"""
+asyncio TCP gossip transport used when the Nodes run in separate processes.
+"""
+
+import asyncio
+import queue
+import struct
+import threading
+import time
+
+from .event import encode_sync
+from .node import SYNC_TIMEOUT
+
+
+# TCP transport frame layout: body length, message type. The body follows.
+NET_FRAME = struct.Struct("<IB")
+MSG_SYNC = 1  # Sync request, body: sender creator id (uint16)
+MSG_KNOWN = 2  # Reply, body: receiver's known_counts() as one uint32 per creator, then its fork_slots as FORK_SLOT
+MSG_EVENTS = 3  # Body: sync packet built by encode_sync
+MSG_DONE = 4  # Receiver has inserted the Events and created its sync Event
+FORK_SLOT = struct.Struct("<HI")  # Creator id, sequence number of a slot the receiver holds both Events of
+
+
+async def read_frame(reader):
+    '''
+    Reads one length-prefixed frame from a TCP stream.
+
+    Args:
+        reader (asyncio.StreamReader): The stream.
+
+    Returns:
+        (tuple): Message type (int) and body (bytes).
+
+    '''
+
+    size, kind = NET_FRAME.unpack(await reader.readexactly(NET_FRAME.size))
+    return kind, await reader.readexactly(size)
+
+
+def write_frame(writer, kind, body=b""):
+    '''
+    Queues one length-prefixed frame on a TCP stream. The caller drains the writer.
+
+    Args:
+        writer (asyncio.StreamWriter): The stream.
+        kind (int): Message type.
+        body (bytes): Message body.
+
+    '''
+
+    writer.write(NET_FRAME.pack(len(body), kind) + body)
+    return
+
+
+class Transport:
+    """
+    asyncio TCP gossip transport used by begin_sync and wait_sync when SIM is False. Every message is a length-prefixed
+    frame. A Node keeps one persistent connection per peer for the syncs it starts and serves syncs from any number of
+    peers at once. The event loop runs on its own thread and is the only thread that changes the Node's hashgraph.
+
+    """
+
+    def __init__(self, node, addresses):
+        '''
+        Args:
+            node (object Node): The local Node.
+            addresses (dict): Node name -> (host, port) for every Node, the local one included.
+
+        '''
+        self.node = node
+        self.addresses = addresses
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.server = None
+        self.pool = {}  # Peer name -> (reader, writer, lock) of the connection used for syncs this Node starts
+        self.inbound = set()  # Writers of the connections peers opened to sync with this Node
+        self.completed = queue.Queue()  # Names of the Nodes whose inbound syncs have finished, read by wait_sync
+
+    def start(self):
+        '''
+        Starts the event loop thread and listens for syncs on the local Node's address.
+
+        '''
+
+        self.thread.start()
+        host, port = self.addresses[self.node.name]
+        self.server = self.call(asyncio.start_server(self.serve, host, port))
+        return
+
+    def stop(self):
+        '''
+        Closes the listener, every pooled connection and every inbound connection, then stops the event loop.
+
+        '''
+
+        async def close():
+            self.server.close()
+            for reader, writer, lock in self.pool.values():
+                writer.close()
+            self.pool = {}
+            for writer in self.inbound:
+                writer.close()  # Each serve() then reads end of stream and returns
+            serving = [i for i in asyncio.all_tasks() if i is not asyncio.current_task()]
+            if serving:
+                await asyncio.wait(serving, timeout=SYNC_TIMEOUT)
+
+        self.call(close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        return
+
+    def call(self, coroutine, timeout=None):
+        '''
+        Runs a coroutine on the event loop from another thread and waits for its result.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+            timeout (float): Seconds before the coroutine is cancelled, None to wait indefinitely.
+
+        Returns:
+            The coroutine's result.
+
+        '''
+
+        return asyncio.run_coroutine_threadsafe(asyncio.wait_for(coroutine, timeout), self.loop).result()
+
+    async def connect(self, peer):
+        '''
+        Returns the pooled connection to a peer, opening it first if needed.
+
+        Args:
+            peer (String): Name of the peer.
+
+        Returns:
+            (tuple): reader, writer and the lock that keeps one sync at a time on the connection.
+
+        '''
+
+        if peer not in self.pool:
+            host, port = self.addresses[peer]
+            reader, writer = await asyncio.open_connection(host, port)
+            self.pool[peer] = (reader, writer, asyncio.Lock())
+        return self.pool[peer]
+
+    async def sync(self, peer):
+        '''
+        Syncs with a peer over its pooled connection: asks for its known counts and fork slots, sends the Events it is missing and waits
+        until it has recorded the sync.
+
+        Args:
+            peer (String): Name of the receiving Node.
+
+        Returns:
+            (SyncReport): Counters for the sync.
+
+        '''
+
+        start = time.perf_counter()
+        n = len(self.node.network.names)
+        reader, writer, lock = await self.connect(peer)
+        async with lock:
+            try:
+                write_frame(writer, MSG_SYNC, struct.pack("<H", self.node.id))
+                kind, body = await read_frame(reader)
+                if kind != MSG_KNOWN:
+                    raise ValueError("Node {} answered a sync request with message {}".format(peer, kind))
+                known = struct.unpack_from("<{}I".format(n), body)
+                slots = set(i for i in FORK_SLOT.iter_unpack(body[4 * n:]))
+                missing = self.node.events_since(known, slots=slots)
+                packet = encode_sync(missing)
+                write_frame(writer, MSG_EVENTS, packet)
+                await writer.drain()
+                kind, body = await read_frame(reader)
+                if kind != MSG_DONE:
+                    raise ValueError("Node {} did not finish the sync".format(peer))
+            except BaseException:
+                # The stream is at an unknown point of the exchange, so the connection cannot be reused
+                if self.pool.get(peer, (None, None, None))[1] is writer:
+                    del self.pool[peer]
+                writer.close()
+                raise
+        return self.node.record_sync(peer, missing, packet, time.perf_counter() - start)
+
+    async def serve(self, reader, writer):
+        '''
+        Serves the syncs a peer starts over one connection until it is closed. Consensus runs after each sync.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's reader.
+            writer (asyncio.StreamWriter): The connection's writer.
+
+        '''
+
+        node = self.node
+        n = len(node.network.names)
+        self.inbound.add(writer)
+        try:
+            while True:
+                kind, body = await read_frame(reader)
+                if kind != MSG_SYNC or struct.unpack("<H", body)[0] >= n:
+                    break
+                sender = node.network.nodes[struct.unpack("<H", body)[0]]
+                slots = b"".join(FORK_SLOT.pack(*i) for i in node.fork_slots)
+                write_frame(writer, MSG_KNOWN, struct.pack("<{}I".format(n), *node.known_counts()) + slots)
+                await writer.drain()
+                kind, packet = await read_frame(reader)
+                if kind != MSG_EVENTS:
+                    break
+
+                node.receive_sync(sender, packet)
+                node.divide_rounds()
+                node.decide_fame()
+                node.find_order()  # Never pruned: the protocol has no snapshot message to bootstrap a lagging peer
+
+                write_frame(writer, MSG_DONE)
+                await writer.drain()
+                self.completed.put(sender.name)
+        except (OSError, asyncio.IncompleteReadError, struct.error, ValueError):
+            pass
+        finally:
+            self.inbound.discard(writer)
+            writer.close()
+        return
+
+
+def run_transport(nw, node_id, host, port, steps, interval):
+    '''
+    Runs one Node of the Network as its own process, gossiping with the others over TCP. Node i listens on port + i, and
+    every process builds the same Network from the same seed, so the key registry matches without exchanging keys.
+
+    Args:
+        nw (object Network): Network whose Node node_id runs here; the other Nodes only provide names and keys.
+        node_id (int): Creator id of the local Node.
+        host (String): Address every Node listens on.
+        port (int): Listening port of Node 0.
+        steps (int): Number of syncs the local Node starts.
+        interval (float): Seconds to wait for an inbound sync between outbound ones.
+
+    Returns:
+        (dict): Summary of the run.
+
+    '''
+
+    node = nw.nodes[node_id]
+    node.transport = Transport(node, {name: (host, port + i) for i, name in enumerate(nw.names)})
+    node.transport.start()
+    start = time.perf_counter()
+    node.main(steps, interval)
+    while node.wait_sync(3 * interval):  # Keep serving until the other Nodes have finished too
+        pass
+    elapsed = time.perf_counter() - start
+    node.transport.stop()
+
+    return {
+            "node": node.name,
+            "seconds": elapsed,
+            "syncs": steps,
+            "events": sum(node.known_counts()),
+            "events_sent": node.events_sent,
+            "bytes_sent": node.bytes_sent,
+            "rounds_decided": node.fame_round - 1,
+            "events_ordered": node.consensus_base + len(node.consensus),
+            "order_digest": node.order_digest().hex()[:16],
+    }
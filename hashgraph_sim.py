@@ -14,12 +14,25 @@ __author__ = "Brett Martin"
 ===========================================================
 """
 
+import concurrent.futures
 import datetime
-import nacl.encoding
-import nacl.signing
-import pickle
 import os
+import queue
 import random
+import struct
+import threading
+import time
+
+from hashgraph import crypto  # Loads PyNaCl on first use
+from hashgraph.event import SAMPLE_RECORD, pack_sample  # Same relay sample records as the hashgraph package
+
+# Canonical event layout: timestamp (ns), owner name length, transaction payload length. The owner name and payload follow.
+EVENT_HEADER = struct.Struct("<qHI")
+# The payload is the event's relay sample records (SAMPLE_RECORD) back to back
+INGEST_CAPACITY = 1024  # Samples a member's ingest queue holds before the sampler blocks
+BATCH_MAX_COUNT = 64  # Samples packed into one event at most
+BATCH_MAX_BYTES = 1024  # Packed sample bytes of one event at most
+SAMPLE_INTERVAL = 0.1  # Seconds between two samples of a member's relay
 
 class Transaction:
 
@@ -33,19 +46,38 @@ class Event:
 
     """
 
+    __slots__ = ("owner", "transactions", "timestamp", "hash")
+
     def __init__(self, owner, timestamp, transactions=[]):
         '''
         Initializes an event object with all necessary information and signs it with the owner member's signature.
 
         Args:
             owner (class Member): Member which initialized the event.
-            transactions (list): Contains information about the transactions (such as voltage or current data for certain relays)
+            transactions (list): Relay sample records (bytes, SAMPLE_RECORD) carried by the event
 
         '''
         self.owner = owner
         self.transactions = transactions
         self.timestamp = timestamp
-        self.hash = None
+        self.hash = None # Detached 64-byte signature of the canonical encoding
+
+    def encode(self):
+        '''
+        Packs the event into its canonical, fixed-layout binary form so that only the owner name, timestamp and
+        transactions are signed, not the owner object and its keys.
+
+        Returns:
+            (bytes): The canonical encoding of the event.
+
+        '''
+        name = getattr(self.owner, "name", "").encode()
+        payload = b"".join(self.transactions)
+        if self.timestamp is not None:
+            timestamp = int(self.timestamp.timestamp() * 1000000000)
+        else:
+            timestamp = 0
+        return EVENT_HEADER.pack(timestamp, len(name), len(payload)) + name + payload
 
 
 class Member:
@@ -62,41 +94,42 @@ class Member:
         '''
         self.name = name
         self.events = []
-        self.signing_key = (nacl.signing.SigningKey.generate())
+        self.signing_key = crypto.signing_key()
         # Keys should be generated on each node, not on a server-side script like this. For simulation purposes, we'll include the keys in the Member class.
+        self.verify_keys = {}
+        # Key registry shared by every member of the graph: member name -> parsed VerifyKey. Filled by HashGraphStruct.add_members.
+        self.ingest = queue.Queue(INGEST_CAPACITY)
+        # Relay samples waiting for the member's next event. put blocks while it is full, so sampling cannot outrun event creation.
 
     def sign_event_func(self, event):
         '''
-        Uses Pickle to convert the event object to type byte. Signs the byte-type event created or agreed upon by the member and generates a verify key and a hex encoded verify key.
+        Signs the canonical encoding of the event created or agreed upon by the member. The verify key is not attached;
+        other members look it up by the owner's name in the key registry.
 
         Args:
             event (object Event): Event object to be signed by the member.
 
         Returns:
-            (tuple): Contains the signed event, verify key, and the hex encoding of the key.
+            (bytes): The detached 64-byte signature.
 
         '''
-        obj_string = pickle.dumps(event)
+        obj_string = event.encode()
         signed = self.signing_key.sign(obj_string)
-        verify_key = self.signing_key.verify_key
-        verify_hex = verify_key.encode(encoder=nacl.encoding.HexEncoder)
-        return (signed, verify_key, verify_hex)
+        return signed.signature
 
     def verify_key_func(self, event):
         '''
-        Verifies the key by checking the hex encoded verify key with the signed byte-type event.
+        Verifies the event's detached signature over its canonical encoding with the owner's key from the key registry.
 
         Args:
             event (class Event): The event to be verified.
 
         Returns:
-            (int): Value -1 for bad signature, 0 for successful verification.
+            (int): Value -1 for bad signature or unknown owner, 0 for successful verification.
 
         '''
-        verify_key = nacl.signing.VerifyKey(event.hash[2], encoder=nacl.encoding.HexEncoder)
-        try:
-            verify_key.verify(event.hash[0])
-        except nacl.exceptions.BadSignatureError:
+        verify_key = self.verify_keys.get(getattr(event.owner, "name", None))
+        if verify_key is None or not crypto.verify(verify_key, event.encode(), event.hash):
             return -1
         return 0
 
@@ -109,14 +142,15 @@ class Member:
         print("Name: {}\nEvents: {}\nKey: {}\n".format(self.name, self.events, self.signing_key.sign))
         try:
             for i in self.events:
-                print("Event details:\nOwner:\t\t {}\nTransaction(s):\t {}\nTimestamp:\t {}\nHash:\n\t Signed:\t\t {}...\n\tVerify Key: \t\t{}\n\tVerify Key Hex: \t{}\n".format(i.owner.name, i.transactions, i.timestamp, i.hash[0][0:180], i.hash[1], i.hash[2]))
+                print("Event details:\nOwner:\t\t {}\nTransaction(s):\t {}\nTimestamp:\t {}\nSignature:\t {}\n".format(i.owner.name, i.transactions, i.timestamp, i.hash.hex()))
         except AttributeError:
             print("No events exist for Member {}\n".format(self.name))
 
         run_test = input("Run key verification test on member {}? (y/n)". format(self.name))
 
         if run_test == 'y':
-            self.events.append(Event(type(self), None, ["ECE463", "ECE464"]))
+            # Two zeroed test samples; the encoding only accepts SAMPLE_RECORD bytes as transactions
+            self.events.append(Event(self, None, [pack_sample(0, 0, [0.0] * 3, [0.0] * 3)] * 2))
             test_event = self.events.pop()
             test_event.hash = self.sign_event_func(test_event)
             if self.verify_key_func(test_event) == 0:
@@ -142,37 +176,140 @@ S
 
         '''
         self.members = []
+        self.verify_keys = {}
+        self.executor = None
+        # Thread pool for verifying on every member at once; PyNaCl releases the GIL during signature checks
         self.active = True
+        self.samplers = []
+        # One thread per member sampling its relay every SAMPLE_INTERVAL, so samples pile up between events
+
+    def add_members(self, members):
+        '''
+        Adds members to the graph and registers each member's verify key once, so verification never has to parse keys.
+
+        Args:
+            members (list): The members (class Member) to add.
+
+        '''
+        for i in members:
+            self.verify_keys[i.name] = i.signing_key.verify_key
+            i.verify_keys = self.verify_keys
+        self.members.extend(members)
+
+        return
+
+    def verify_all(self, members, event):
+        '''
+        Has each member verify the same event, fanning the signature checks out over a thread pool.
+
+        Args:
+            members (list): The members (class Member) verifying the event.
+            event (class Event): The event to be verified.
+
+        Returns:
+            (list): Value -1 or 0 from verify_key_func for each member, in order.
+
+        '''
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max(1, len(self.members)))
+        return list(self.executor.map(lambda i: i.verify_key_func(event), members))
+
+    def sample_relay(self, member, event_time):
+        '''
+        Simulates sampling the member's relay.
+
+        Args:
+            member (class Member): The member sampling its relay.
+            event_time (datetime): Time of the sample.
+
+        Returns:
+            (bytes): The sample packed as a SAMPLE_RECORD.
+
+        '''
+        timestamp = int(event_time.timestamp() * 1000000000)
+        current = [random.randint(30,50) for i in range(3)]
+        voltage = [random.randint(20,40) for i in range(3)]
+        return pack_sample(timestamp, self.members.index(member), current, voltage)
+
+    def start_sampling(self):
+        '''
+        Starts sampling every member's relay in the background. Each sample waits in the member's ingest queue until the
+        member's next event, and the sampler blocks while that queue is full.
+
+        '''
+        for i in self.members:
+            sampler = threading.Thread(target=self.sample_loop, args=(i,), daemon=True)
+            sampler.start()
+            self.samplers.append(sampler)
+
+        return
+
+    def sample_loop(self, member):
+        '''
+        Samples the member's relay every SAMPLE_INTERVAL until the simulation ends.
+
+        Args:
+            member (class Member): The member sampling its relay.
+
+        '''
+        while self.active:
+            member.ingest.put(self.sample_relay(member, datetime.datetime.now()))
+            time.sleep(SAMPLE_INTERVAL)
+
+        return
+
+    def take_samples(self, member):
+        '''
+        Drains the samples queued by the member, up to BATCH_MAX_COUNT and BATCH_MAX_BYTES, so that they share one event
+        and its signature.
+
+        Args:
+            member (class Member): The member creating the event.
+
+        Returns:
+            (list): The queued samples, oldest first.
+
+        '''
+        batch = []
+        while len(batch) < BATCH_MAX_COUNT and (len(batch) + 1) * SAMPLE_RECORD.size <= BATCH_MAX_BYTES:
+            try:
+                batch.append(member.ingest.get_nowait())
+            except queue.Empty:
+                break
+        return batch
 
     def sampling_simulation_safe(self, member):
         event_time = datetime.datetime.now()
-        new_sample = [{"IA":random.randint(30,50), "IB":random.randint(30,50), "IC":random.randint(30,50)}, {"VA":random.randint(20,40), "VB":random.randint(20,40), "VC":random.randint(20,40)}]
-        new_event = Event(member, event_time, new_sample)
+        samples = self.take_samples(member)
+        if not samples:
+            samples = [self.sample_relay(member, event_time)]  # Nothing sampled since the last event yet
+        new_event = Event(member, event_time, samples)
         new_event.hash = member.sign_event_func(new_event)
         member.events.append(new_event)
 
         print("\nEvent created by {}\n\n".format(member.name))
 
-        for i in self.members:
-            if i != member:
+        others = [i for i in self.members if i != member]
+        for i, result in zip(others, self.verify_all(others, new_event)):
+            if result == 0:
+                # Invalid events are never added to a member's events
                 i.events.append(new_event)
-                if i.verify_key_func(i.events[-1]) == 0:
-                    print("Event verified by {}!\n\n".format(i.name))
-                else:
-                    print("Event could not be verified by {}\n\n".format(i.name))
+                print("Event verified by {}!\n\n".format(i.name))
+            else:
+                print("Event could not be verified by {}\n\n".format(i.name))
 
         return
 
     def sampling_simulation_corrupt(self, member, corr_member):
         event_time = datetime.datetime.now()
-        new_sample = [{"IA":random.randint(30,50), "IB":random.randint(30,50), "IC":random.randint(30,50)}, {"VA":random.randint(20,40), "VB":random.randint(20,40), "VC":random.randint(20,40)}]
+        new_sample = [self.sample_relay(member, event_time)]
         new_event = Event(member, event_time, new_sample)
         new_event.hash = member.sign_event_func(new_event)
         member.events.append(new_event)
 
         print("\nEvent created by {}\n\n".format(member.name))
         
-        corr_sample = [{"IA":random.randint(30,50), "IB":random.randint(30,50), "IC":random.randint(30,50)}, {"VA":random.randint(20,40), "VB":random.randint(20,40), "VC":random.randint(20,40)}]
+        corr_sample = [self.sample_relay(member, event_time)]
         corr_event = Event(member, event_time, corr_sample)
         corr_event.hash = corr_member.sign_event_func(corr_event)
 
@@ -188,10 +325,10 @@ S
                         print("Event could not be verified by {}\n\n".format(i.name))
                 else:
                     i.events.append(corr_event)
-                    try:
-                        i.events[-1].hash[1].verify(i.events[-1])
-                    except:
-                        print("Event could not be verified by2 {}\n\n".format(i.name))
+                    if i.verify_key_func(i.events[-1]) == 0:
+                        print("Event verified by {}!\n\n".format(i.name))
+                    else:
+                        print("Event could not be verified by {}\n\n".format(i.name))
                 
         return
 
@@ -207,37 +344,50 @@ S
         return
 
 
-# Creates the simulation of the network (or graph) in which the nodes will reside
-network = HashGraphStruct()
-
-# Creates four example nodes IAW the example from the Hashgraph Examples White Paper
-alice = Member("Alice")
-bob = Member("Bob")
-carol = Member("Carol")
-dave = Member("Dave")
-
-# Adds each member to the network (or graph)
-network.members.extend([alice, bob, carol, dave])
-
-os.system('clear')
-
-while(network.active):
-
-    mode = input("Select mode (debug, simulate, corrupt, dump, clear, quit): ")
-
-    if mode == "debug":
-        print("\n")
-        for i in network.members:
-            i.debug_member()
-    elif mode == "simulate":
-        network.sampling_simulation_safe(alice)
-    elif mode == "corrupt":
-        network.sampling_simulation_corrupt(alice, carol)
-    elif mode == "dump":
-        network.event_dump()
-    elif mode == "clear":
-        os.system('clear')
-    elif mode == "quit":
-        network.active = False
-    else:
-        print("{} is not a valid mode".format(mode))
+def main():
+    '''
+    Runs the interactive simulation until the user quits.
+
+    '''
+
+    # Creates the simulation of the network (or graph) in which the nodes will reside
+    network = HashGraphStruct()
+
+    # Creates four example nodes IAW the example from the Hashgraph Examples White Paper
+    alice = Member("Alice")
+    bob = Member("Bob")
+    carol = Member("Carol")
+    dave = Member("Dave")
+
+    # Adds each member to the network (or graph)
+    network.add_members([alice, bob, carol, dave])
+    network.start_sampling()
+
+    os.system('clear')
+
+    while(network.active):
+
+        mode = input("Select mode (debug, simulate, corrupt, dump, clear, quit): ")
+
+        if mode == "debug":
+            print("\n")
+            for i in network.members:
+                i.debug_member()
+        elif mode == "simulate":
+            network.sampling_simulation_safe(alice)
+        elif mode == "corrupt":
+            network.sampling_simulation_corrupt(alice, carol)
+        elif mode == "dump":
+            network.event_dump()
+        elif mode == "clear":
+            os.system('clear')
+        elif mode == "quit":
+            network.active = False
+        else:
+            print("{} is not a valid mode".format(mode))
+
+    return
+
+
+if __name__ == "__main__":
+    main()